@@ -26,10 +26,70 @@ import html as _html
 import json
 import re
 
+import orjson
+
 
 _ANSI_NARROW_NBSP = "\u202f"
 
 
+def _loads_json_bytes(raw: bytes) -> Any:
+    """orjson fast path with a stdlib fallback.
+
+    orjson rejects some input json accepts (lone surrogate escapes, NaN/Infinity,
+    nesting deeper than 1024), so retry with json.loads before giving up.
+    """
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw.decode("utf-8"))
+
+
+# Activity-log parsing runs these per Takeout cell, so they are compiled once here.
+_WS_RE = re.compile(r"\s+")
+_TAG_RE = re.compile(r"<[^>]+>")
+# English style: Jan 31, 2026, 6:15:01 AM PST
+_TAKEOUT_TS_EN_RE = re.compile(
+    r"^(?P<mon>[A-Za-z]{3}) (?P<day>\d{1,2}), (?P<year>\d{4}), (?P<h>\d{1,2}):(?P<mi>\d{2}):(?P<se>\d{2}) (?P<ampm>AM|PM) (?P<tz>[A-Za-z]{2,4})$"
+)
+# Chinese style: 2026年1月10日 06:01:02 PST
+_TAKEOUT_TS_CN_RE = re.compile(
+    r"^(?P<year>\d{4})年(?P<mon>\d{1,2})月(?P<day>\d{1,2})日\s*(?:(?P<cn_ampm>上午|下午)\s*)?(?P<h>\d{1,2}):(?P<mi>\d{2}):(?P<se>\d{2})\s*(?P<tz>[A-Za-z]{2,4})$"
+)
+_PRE_CODE_RE = re.compile(r"<pre>\s*<code>(.*?)</code>\s*</pre>", re.IGNORECASE | re.DOTALL)
+# (pattern, replacement) in application order; see _strip_tags_keep_basic_md.
+_INLINE_TAG_SUBS = [
+    (re.compile(r"<\s*strong\s*>", re.IGNORECASE), "**"),
+    (re.compile(r"<\s*/\s*strong\s*>", re.IGNORECASE), "**"),
+    (re.compile(r"<\s*em\s*>", re.IGNORECASE), "_"),
+    (re.compile(r"<\s*/\s*em\s*>", re.IGNORECASE), "_"),
+]
+# One pass for all levels: replacements contain no tags, so per-level passes can't interact.
+_HEADING_OPEN_RE = re.compile(r"<\s*h([1-6])[^>]*>", re.IGNORECASE)
+_HEADING_CLOSE_RE = re.compile(r"<\s*/\s*h[1-6]\s*>", re.IGNORECASE)
+_BLOCK_TAG_SUBS = [
+    # Paragraphs + line breaks
+    (re.compile(r"<\s*p[^>]*>", re.IGNORECASE), ""),
+    (re.compile(r"<\s*/\s*p\s*>", re.IGNORECASE), "\n\n"),
+    (re.compile(r"<\s*br\s*/?\s*>", re.IGNORECASE), "\n"),
+    # Lists
+    (re.compile(r"<\s*li[^>]*>", re.IGNORECASE), "\n- "),
+    (re.compile(r"<\s*/\s*li\s*>", re.IGNORECASE), ""),
+    (re.compile(r"<\s*/\s*ol\s*>", re.IGNORECASE), "\n"),
+    (re.compile(r"<\s*/\s*ul\s*>", re.IGNORECASE), "\n"),
+]
+_LINK_RE = re.compile(r"<\s*a[^>]*href=\"([^\"]+)\"[^>]*>(.*?)</a>", re.IGNORECASE | re.DOTALL)
+_CODE_OPEN_RE = re.compile(r"<\s*code[^>]*>", re.IGNORECASE)
+_CODE_CLOSE_RE = re.compile(r"<\s*/\s*code\s*>", re.IGNORECASE)
+_CLEANUP_SUBS = [
+    # Collapse excessive spaces/tabs, but keep indentation at line starts intact.
+    (re.compile(r"(?m)(?<!^)[ \t]{2,}"), " "),
+    (re.compile(r"\n{3,}"), "\n\n"),
+    # Fix common list rendering artifacts: empty bullet followed by a code span.
+    (re.compile(r"\n-\s*\n\s*`"), "\n- `"),
+    (re.compile(r"\n-\s*\n\s*\*\*"), "\n- **"),
+]
+
+
 def _iso_to_epoch_seconds(value: Optional[str]) -> Optional[float]:
     if not value or not isinstance(value, str):
         return None
@@ -62,19 +122,11 @@ def _parse_takeout_ts_to_epoch_seconds(value: str) -> Optional[float]:
 
     s = value.strip().replace(_ANSI_NARROW_NBSP, " ")
     # Normalize spaces
-    s = re.sub(r"\s+", " ", s)
+    s = _WS_RE.sub(" ", s)
 
-    # English style: Jan 31, 2026, 6:15:01 AM PST
-    m = re.match(
-        r"^(?P<mon>[A-Za-z]{3}) (?P<day>\d{1,2}), (?P<year>\d{4}), (?P<h>\d{1,2}):(?P<mi>\d{2}):(?P<se>\d{2}) (?P<ampm>AM|PM) (?P<tz>[A-Za-z]{2,4})$",
-        s,
-    )
+    m = _TAKEOUT_TS_EN_RE.match(s)
     if not m:
-        # Chinese style: 2026年1月10日 06:01:02 PST
-        m2 = re.match(
-            r"^(?P<year>\d{4})年(?P<mon>\d{1,2})月(?P<day>\d{1,2})日\s*(?:(?P<cn_ampm>上午|下午)\s*)?(?P<h>\d{1,2}):(?P<mi>\d{2}):(?P<se>\d{2})\s*(?P<tz>[A-Za-z]{2,4})$",
-            s,
-        )
+        m2 = _TAKEOUT_TS_CN_RE.match(s)
         if not m2:
             return None
 
@@ -190,7 +242,7 @@ def _strip_tags_keep_basic_md(html_text: str) -> str:
     def _code_block(m: re.Match) -> str:
         body = m.group(1) or ""
         # Remove remaining tags inside code
-        body = re.sub(r"<[^>]+>", "", body)
+        body = _TAG_RE.sub("", body)
         body = _html.unescape(body)
         body = body.replace("\r\n", "\n").replace("\r", "\n")
         body = body.strip("\n")
@@ -199,50 +251,37 @@ def _strip_tags_keep_basic_md(html_text: str) -> str:
         code_blocks.append(fenced)
         return f"\n@@@CODEBLOCK{idx}@@@\n"
 
-    s = re.sub(r"<pre>\s*<code>(.*?)</code>\s*</pre>", _code_block, s, flags=re.IGNORECASE | re.DOTALL)
-
-    # Inline formatting
-    s = re.sub(r"<\s*strong\s*>", "**", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*/\s*strong\s*>", "**", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*em\s*>", "_", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*/\s*em\s*>", "_", s, flags=re.IGNORECASE)
+    s = _PRE_CODE_RE.sub(_code_block, s)
 
-    # Headings
-    for level in range(1, 7):
-        s = re.sub(rf"<\s*h{level}[^>]*>", f"\n\n{'#' * min(level, 4)} ", s, flags=re.IGNORECASE)
-        s = re.sub(rf"<\s*/\s*h{level}\s*>", "\n\n", s, flags=re.IGNORECASE)
+    # Most cells are plain text; skip the tag passes entirely when there is no tag at all.
+    if "<" in s:
+        # Inline formatting
+        for pattern, repl in _INLINE_TAG_SUBS:
+            s = pattern.sub(repl, s)
 
-    # Paragraphs + line breaks
-    s = re.sub(r"<\s*p[^>]*>", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*/\s*p\s*>", "\n\n", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*br\s*/?\s*>", "\n", s, flags=re.IGNORECASE)
+        # Headings
+        s = _HEADING_OPEN_RE.sub(lambda m: f"\n\n{'#' * min(int(m.group(1)), 4)} ", s)
+        s = _HEADING_CLOSE_RE.sub("\n\n", s)
 
-    # Lists
-    s = re.sub(r"<\s*li[^>]*>", "\n- ", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*/\s*li\s*>", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*/\s*ol\s*>", "\n", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*/\s*ul\s*>", "\n", s, flags=re.IGNORECASE)
+        # Paragraphs + line breaks, lists
+        for pattern, repl in _BLOCK_TAG_SUBS:
+            s = pattern.sub(repl, s)
 
-    # Links: keep as markdown
-    s = re.sub(r"<\s*a[^>]*href=\"([^\"]+)\"[^>]*>(.*?)</a>", lambda m: f"[{re.sub(r'<[^>]+>', '', m.group(2) or '').strip() or m.group(1)}]({m.group(1)})", s, flags=re.IGNORECASE | re.DOTALL)
+        # Links: keep as markdown
+        s = _LINK_RE.sub(lambda m: f"[{_TAG_RE.sub('', m.group(2) or '').strip() or m.group(1)}]({m.group(1)})", s)
 
-    # Inline code (best-effort): <code>...</code>
-    s = re.sub(r"<\s*code[^>]*>", "`", s, flags=re.IGNORECASE)
-    s = re.sub(r"<\s*/\s*code\s*>", "`", s, flags=re.IGNORECASE)
+        # Inline code (best-effort): <code>...</code>
+        s = _CODE_OPEN_RE.sub("`", s)
+        s = _CODE_CLOSE_RE.sub("`", s)
 
-    # Drop remaining tags
-    s = re.sub(r"<[^>]+>", "", s)
+        # Drop remaining tags
+        s = _TAG_RE.sub("", s)
 
     # Cleanup whitespace (outside fenced code blocks)
     s = s.replace("\u00a0", " ")
     s = s.replace(_ANSI_NARROW_NBSP, " ")
-    # Collapse excessive spaces/tabs, but keep indentation at line starts intact.
-    s = re.sub(r"(?m)(?<!^)[ \t]{2,}", " ", s)
-    s = re.sub(r"\n{3,}", "\n\n", s)
-
-    # Fix common list rendering artifacts: empty bullet followed by a code span.
-    s = re.sub(r"\n-\s*\n\s*`", "\n- `", s)
-    s = re.sub(r"\n-\s*\n\s*\*\*", "\n- **", s)
+    for pattern, repl in _CLEANUP_SUBS:
+        s = pattern.sub(repl, s)
 
     # Restore code blocks
     for i, block in enumerate(code_blocks):
@@ -305,8 +344,8 @@ def load_claude_export(folder_name: str, folder_path: Path) -> ClaudeExportCache
 
     mtime = float(conversations_path.stat().st_mtime)
 
-    with open(conversations_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    # conversations.json holds every Claude chat; orjson parses it natively in one pass.
+    data = _loads_json_bytes(conversations_path.read_bytes())
 
     conversations: List[ClaudeConversationRecord] = []
     by_uuid: Dict[str, ClaudeConversationRecord] = {}
@@ -338,8 +377,7 @@ def load_claude_export(folder_name: str, folder_path: Path) -> ClaudeExportCache
     memories_path = folder_path / "memories.json"
     if memories_path.exists() and memories_path.is_file():
         try:
-            with open(memories_path, "r", encoding="utf-8") as f:
-                mem_data = json.load(f)
+            mem_data = _loads_json_bytes(memories_path.read_bytes())
             if isinstance(mem_data, list) and mem_data:
                 pm = mem_data[0].get("project_memories")
                 if isinstance(pm, dict):
@@ -352,8 +390,7 @@ def load_claude_export(folder_name: str, folder_path: Path) -> ClaudeExportCache
     projects_path = folder_path / "projects.json"
     if projects_path.exists() and projects_path.is_file():
         try:
-            with open(projects_path, "r", encoding="utf-8") as f:
-                proj_data = json.load(f)
+            proj_data = _loads_json_bytes(projects_path.read_bytes())
             if isinstance(proj_data, list):
                 for item in proj_data:
                     if not isinstance(item, dict):
@@ -659,7 +696,7 @@ def _extract_prompt(cell_html: str) -> str:
 
     # Drop attachment-related suffix that sometimes appears inline.
     prompt = re.split(r"\bAttached\b|附加了|已附加|附件", prompt, maxsplit=1)[0]
-    prompt = re.sub(r"\s+", " ", prompt).strip()
+    prompt = _WS_RE.sub(" ", prompt).strip()
     return prompt
 
 
@@ -917,7 +954,7 @@ def load_gemini_activity(folder_name: str, folder_path: Path) -> GeminiActivityC
         created_at = min(ts_list) if ts_list else None
         updated_at = max(ts_list) if ts_list else None
         first_prompt = next((x.prompt for x in g if x.prompt.strip()), "")
-        first_prompt_norm = re.sub(r"\s+", " ", str(first_prompt or "")).strip()
+        first_prompt_norm = _WS_RE.sub(" ", str(first_prompt or "")).strip()
         conv_title = (first_prompt_norm[:60] if first_prompt_norm else "Gemini Apps").strip() or "Gemini Apps"
 
         thread_key = next((x.thread_key for x in g if x.thread_key), "")
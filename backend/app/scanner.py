@@ -1,12 +1,13 @@
 """文件扫描模块 - 扫描配置的数据源目录，构建对话索引"""
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import os
 import re
-import time
-from watchdog.observers import Observer
-from watchdog.observers.polling import PollingObserver
-from watchdog.events import FileSystemEventHandler
+import sys
+import threading
 from config import Config
 from app.data_sources import DataSourceStore, FolderBinding
 
@@ -22,51 +23,148 @@ from app.external_sources import (
 )
 from app.overrides import load_overrides
 
-class DataFileHandler(FileSystemEventHandler):
-    """文件系统事件处理器"""
-    
-    def __init__(self, scanner):
-        self.scanner = scanner
-        self.last_scan_time = 0
-        self.scan_cooldown = 2  # 2秒冷却时间，避免频繁扫描
-        self._last_mtime_by_path: Dict[str, float] = {}
-    
-    def on_any_event(self, event):
-        """处理所有文件系统事件"""
-        # 只关心JSON文件的变化
-        if event.is_directory or not event.src_path.endswith('.json'):
-            return
+# Header reads can reuse one directory fd (openat + pread) where the platform supports it;
+# Windows has neither dir_fd nor pread, so it keeps the plain open()/read() path.
+_DIR_FD_READS = hasattr(os, "pread") and os.open in os.supports_dir_fd
+_HEADER_READ_BYTES = 64 * 1024
+# ChatGPT exports put create_time/update_time among the first top-level keys, so a small
+# probe usually suffices; the full header is only read when the probe misses.
+_HEADER_PROBE_BYTES = 4 * 1024
+# Overlap when rescanning after expanding the probe, so a key split at the boundary still matches.
+_HEADER_RESCAN_OVERLAP = 256
+# Source folders are re-hashed on this interval; listings may be stale for at most this long.
+_WATCH_POLL_SEC = 2.0
+
+_ASCII_TOKEN_RE = re.compile(r"[0-9A-Za-z]{2,}")
+_WS_RE = re.compile(r"\s+")
+
+
+def _is_cjk(ch: str) -> bool:
+    return "\u4e00" <= ch <= "\u9fff"
+
+
+@lru_cache(maxsize=4096)
+def _tokens(s: str) -> Tuple[frozenset, frozenset]:
+    """ASCII tokens and CJK chars used to match Claude conversations to projects."""
+    s = (s or "").lower()
+    ascii_toks = frozenset(_ASCII_TOKEN_RE.findall(s))
+    cjk = frozenset(ch for ch in s if _is_cjk(ch))
+    return ascii_toks, cjk
+
+
+def _first_user_snippet(conv_raw: Dict[str, Any]) -> str:
+    msgs = conv_raw.get('chat_messages')
+    if not isinstance(msgs, list):
+        return ''
+    for m in msgs:
+        if not isinstance(m, dict):
+            continue
+        sender = (m.get('sender') or '').strip().lower()
+        if sender not in {'human', 'user'}:
+            continue
+        t = m.get('text')
+        if isinstance(t, str) and t.strip():
+            return _WS_RE.sub(" ", t).strip()[:80]
+        cl = m.get('content')
+        if isinstance(cl, list):
+            for part in cl:
+                if isinstance(part, dict) and isinstance(part.get('text'), str) and part.get('text').strip():
+                    return _WS_RE.sub(" ", part.get('text')).strip()[:80]
+    return ''
+
+
+def _conv_text(conv_raw: Dict[str, Any]) -> str:
+    # Only use title+summary for project assignment to avoid content-based skew.
+    out = []
+    name = conv_raw.get('name')
+    summary = conv_raw.get('summary')
+    if isinstance(name, str) and name.strip():
+        out.append(name)
+    if isinstance(summary, str) and summary.strip():
+        out.append(summary)
+    return "\n".join(out)
+
+
+def _score(conv_ascii: frozenset, conv_cjk: frozenset, p: Dict[str, Any]) -> float:
+    # Normalize overlap so large project profiles don't dominate.
+    a_i = len(conv_ascii & p['ascii'])
+    a_u = len(conv_ascii | p['ascii'])
+    c_i = len(conv_cjk & p['cjk'])
+    c_u = len(conv_cjk | p['cjk'])
+
+    a_sim = (a_i / a_u) if a_u else 0.0
+    c_sim = (c_i / c_u) if c_u else 0.0
+    return 4.0 * a_sim + 1.0 * c_sim
+
+
+# Canonical Takeout directories that hold Gemini's MyActivity file (see find_gemini_activity_file).
+_GEMINI_ACTIVITY_DIRS = (
+    ("Takeout", "My Activity", "Gemini Apps"),
+    ("Takeout", "Access Log Activity", "My Activity", "Gemini Apps"),
+    ("Takeout", "我的活动", "Gemini Apps"),
+)
 
-        # Ignore read/open/close events: those can fire frequently on Windows and would
-        # cause the cache to thrash while the app is merely reading JSON files.
-        if getattr(event, "event_type", None) not in {"modified", "created", "deleted", "moved"}:
-            return
 
-        # On some Windows configurations, file reads can still trigger "modified" events
-        # without changing mtime (e.g. metadata/atime). Guard against that to keep the
-        # conversation list cache stable.
+def _folder_kind_signature(folder_path: Path) -> Optional[Tuple[Any, ...]]:
+    """mtimes of the directories folder-kind detection looks into, or None if unreadable.
+
+    Covers the folder, its direct subdirectories (Takeout itself, and the one extra level
+    Gemini web exports may use) and the canonical Gemini Apps directories, so a file that
+    lands in any of them (e.g. a late MyActivity.html) changes the signature even though
+    the folder's own mtime stays put.
+    """
+    try:
+        top = folder_path.stat().st_mtime_ns
+        with os.scandir(folder_path) as it:
+            subdirs = sorted((entry.name, entry.stat().st_mtime_ns) for entry in it if entry.is_dir())
+    except OSError:
+        return None
+    activity = []
+    for parts in _GEMINI_ACTIVITY_DIRS:
         try:
-            if getattr(event, "event_type", None) == "modified":
-                p = Path(event.src_path)
-                if p.exists():
-                    mtime = float(p.stat().st_mtime)
-                    prev = self._last_mtime_by_path.get(event.src_path)
-                    self._last_mtime_by_path[event.src_path] = mtime
-                    if prev is not None and abs(prev - mtime) < 1e-6:
-                        return
-        except Exception:
-            pass
-        
-        current_time = time.time()
-        if current_time - self.last_scan_time < self.scan_cooldown:
-            return
-        
-        self.last_scan_time = current_time
-        print(f"[scanner] detected file change: {event.src_path}")
-        print(f"  event: {event.event_type}")
-        
-        # 清除缓存（如果有的话）
-        self.scanner.clear_cache()
+            activity.append(folder_path.joinpath(*parts).stat().st_mtime_ns)
+        except OSError:
+            activity.append(None)
+    return top, tuple(subdirs), tuple(activity)
+
+
+def _compute_root_hash(root: str) -> bytes:
+    """Digest of (path, size, mtime_ns) for every JSON file under `root`.
+
+    Used by the polling watcher: one scandir walk per interval, no per-event callbacks.
+    Symlinks are not followed (as with the old watchdog observer), so a link pointing back
+    up the tree can't make every poll recurse until ELOOP/ENAMETOOLONG.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    stack = [root]
+    while stack:
+        cur = stack.pop()
+        try:
+            with os.scandir(cur) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif os.path.normcase(entry.name).endswith('.json'):
+                    st = entry.stat(follow_symlinks=False)
+                    h.update(f"{entry.path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8', 'surrogatepass'))
+            except OSError:
+                continue
+    return h.digest()
+
+
+def _sorted_by_keys(items: List[Dict], sort_keys: List[tuple]) -> List[Dict]:
+    """Order `items` by their parallel `sort_keys`, descending (stable for ties).
+
+    Keeping sort keys out-of-band avoids writing throwaway `_sort_time` fields into
+    every cached listing dict and popping them again afterwards.
+    """
+    order = sorted(range(len(items)), key=sort_keys.__getitem__, reverse=True)
+    return [items[i] for i in order]
+
 
 class ConversationScanner:
     """对话文件扫描器（支持自动监听文件变化）"""
@@ -80,16 +178,29 @@ class ConversationScanner:
         )
         self.current_folder = None
         self._cache = {}  # 简单的缓存
+        # Guards writes to _cache/_special_cache/_file_time_cache/_folder_kind_cache against the
+        # watcher thread and concurrent requests. Scans themselves run outside it, under a
+        # per-key lock, so only one request rescans a folder after invalidation.
+        self._cache_lock = threading.RLock()
+        self._scan_locks: Dict[str, threading.Lock] = {}
+        # Bumped on every invalidation; a listing (_cache or _special_cache) built while an
+        # invalidation raced it is returned but not cached. The time/kind caches are keyed by
+        # mtime, so a racing write there is at worst a redundant entry.
+        self._cache_gen = 0
         self._special_cache: Dict[str, Dict[str, Any]] = {}
-        self._observer = None
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop: Optional[threading.Event] = None
         self._folder_bindings: Dict[str, FolderBinding] = {}
         self._file_time_cache: Dict[str, Tuple[float, Optional[float], Optional[float], float]] = {}
+        # folder path -> (_folder_kind_signature, detected kind); avoids re-sniffing exports per request.
+        self._folder_kind_cache: Dict[str, Tuple[Tuple[Any, ...], str]] = {}
 
         # Fast header parse: exported ChatGPT JSON usually contains create_time/update_time near the top.
-        self._re_update_time = re.compile(r'"update_time"\s*:\s*([0-9]+(?:\.[0-9]+)?)')
-        self._re_create_time = re.compile(r'"create_time"\s*:\s*([0-9]+(?:\.[0-9]+)?)')
+        # Patterns are ASCII-only, so they run directly on the raw header bytes (no UTF-8 decode).
+        # Both keys share one alternation so the header is scanned once, not once per key.
+        self._re_header_time = re.compile(rb'"(update_time|create_time)"\s*:\s*([0-9]+(?:\.[0-9]+)?)')
         # Gemini web export (batchexecute) stores fetch time as ISO string.
-        self._re_fetched_at = re.compile(r'"fetched_at"\s*:\s*"([^"]+)"')
+        self._re_fetched_at = re.compile(rb'"fetched_at"\s*:\s*"([^"]+)"')
         # Fast scan for epoch timestamp pairs inside batchexecute_raw string.
         # Example: [1755227954,114133000]
         self._re_epoch_pair_bytes = re.compile(rb"\[(\d{9,12}),\s*(\d{1,9})\]")
@@ -173,65 +284,78 @@ class ConversationScanner:
 
         return dt.timestamp()
 
-    def _fast_extract_batchexecute_times(self, json_file: Path, head_bytes: bytes) -> Tuple[Optional[float], Optional[float]]:
+    def _iter_epoch_pairs(self, buf: bytes) -> Iterator[float]:
+        """Yield plausible `[sec, nanos]` turn timestamps found in `buf` as epoch seconds."""
+        for m in self._re_epoch_pair_bytes.finditer(buf or b""):
+            try:
+                sec = int(m.group(1))
+                nanos = int(m.group(2))
+            except Exception:
+                continue
+            if not (1_000_000_000 <= sec <= 20_000_000_000):
+                continue
+            if not (0 <= nanos < 1_000_000_000):
+                continue
+            yield float(sec) + (float(nanos) / 1e9)
+
+    def _fast_extract_batchexecute_times(
+        self,
+        json_file: Path,
+        head_bytes: bytes,
+        size: Optional[int] = None,
+    ) -> Tuple[Optional[float], Optional[float]]:
         """Fast best-effort timestamp extraction for Gemini batchexecute exports.
 
         We avoid full JSON parsing for performance. The batchexecute payload contains many
         turn timestamps as `[sec, nanos]` pairs inside the serialized string.
+        The tail (update_time) and, for large files, the head (create_time) are read
+        through a single open file.
         """
-        try:
-            size = int(json_file.stat().st_size)
-        except Exception:
-            size = 0
+        if size is None:
+            try:
+                size = int(json_file.stat().st_size)
+            except Exception:
+                size = 0
 
         # If the export doesn't contain the expected inner payload marker, it's often an
         # "access denied / fetch failure" stub. Push these to the bottom.
         # NOTE: This marker is inside a JSON string, so quotes are escaped.
         has_inner_marker = b'\\"hNvQHb\\"' in (head_bytes or b"")
 
-        def _scan_bytes(buf: bytes) -> List[float]:
-            out: List[float] = []
-            for m in self._re_epoch_pair_bytes.finditer(buf or b""):
-                try:
-                    sec = int(m.group(1))
-                    nanos = int(m.group(2))
-                except Exception:
-                    continue
-                if not (1_000_000_000 <= sec <= 20_000_000_000):
-                    continue
-                if not (0 <= nanos < 1_000_000_000):
-                    continue
-                out.append(float(sec) + (float(nanos) / 1e9))
-            return out
-
-        # Prefer tail for update_time (latest turn often near the end)
-        ts_vals: List[float] = []
+        tail = 512 * 1024
+        update_time: Optional[float] = None
+        create_time: Optional[float] = None
         try:
             with open(json_file, "rb") as f:
+                # Prefer tail for update_time (latest turn often near the end)
                 if size > 0:
-                    tail = 512 * 1024
                     if size > tail:
                         f.seek(max(0, size - tail))
                     buf = f.read(tail)
                 else:
                     buf = head_bytes or b""
-            ts_vals = _scan_bytes(buf)
+
+                if size <= tail:
+                    # The tail covers the whole file: one pass gives both bounds.
+                    for ts in self._iter_epoch_pairs(buf):
+                        if update_time is None or ts > update_time:
+                            update_time = ts
+                        if create_time is None or ts < create_time:
+                            create_time = ts
+                else:
+                    update_time = max(self._iter_epoch_pairs(buf), default=None)
+                    if update_time is not None:
+                        # Try head for create_time (earliest turn), reusing the open file.
+                        try:
+                            f.seek(0)
+                            create_time = min(self._iter_epoch_pairs(f.read(256 * 1024)), default=None)
+                        except Exception:
+                            create_time = None
         except Exception:
-            ts_vals = []
+            update_time = None
+            create_time = None
 
-        if ts_vals:
-            update_time = max(ts_vals)
-            create_time = min(ts_vals) if size <= (512 * 1024) else None
-            if create_time is None:
-                # Try head for create_time (earliest turn)
-                try:
-                    with open(json_file, "rb") as f2:
-                        buf2 = f2.read(256 * 1024)
-                    head_vals = _scan_bytes(buf2)
-                    if head_vals:
-                        create_time = min(head_vals)
-                except Exception:
-                    create_time = None
+        if update_time is not None:
             return update_time, create_time
 
         # No timestamp pairs found: likely invalid export, or a variant without timestamps.
@@ -249,17 +373,29 @@ class ConversationScanner:
         k = (forced_kind or "auto").strip().lower()
         if k in {"chatgpt", "claude", "gemini"}:
             return k
+
+        key = str(folder_path)
+        signature = _folder_kind_signature(folder_path)
+        cached = self._folder_kind_cache.get(key)
+        if cached and signature is not None and cached[0] == signature:
+            return cached[1]
+
+        kind = 'chatgpt'
         try:
             if detect_claude_folder(folder_path):
-                return 'claude'
-            if detect_gemini_folder(folder_path):
-                return 'gemini'
-            if detect_gemini_batchexecute_folder(folder_path):
-                return 'gemini'
+                kind = 'claude'
+            elif detect_gemini_folder(folder_path):
+                kind = 'gemini'
+            elif detect_gemini_batchexecute_folder(folder_path):
+                kind = 'gemini'
         except Exception:
             # Fallback to ChatGPT-style
-            pass
-        return 'chatgpt'
+            kind = 'chatgpt'
+
+        if signature is not None:
+            with self._cache_lock:
+                self._folder_kind_cache[key] = (signature, kind)
+        return kind
 
     def _ensure_special_loaded(self, folder_name: str, folder_path: Path, forced_kind: str = "auto") -> Optional[Dict[str, Any]]:
         """Load and cache special folders (Claude/Gemini)."""
@@ -268,7 +404,10 @@ class ConversationScanner:
             return None
 
         cache_key = (folder_name or '').strip() or folder_path.name
-        cached = self._special_cache.get(cache_key)
+        with self._cache_lock:
+            cached = self._special_cache.get(cache_key)
+            # Loading happens outside the lock; see _store_special.
+            gen = self._cache_gen
 
         if kind == 'claude':
             src = detect_claude_folder(folder_path)
@@ -280,6 +419,7 @@ class ConversationScanner:
 
             claude_cache: ClaudeExportCache = load_claude_export(folder_name=cache_key, folder_path=folder_path)
             listing: Dict[str, List[Dict]] = {}
+            sort_keys: Dict[str, List[tuple]] = {}
             lookup: Dict[Tuple[str, str], ChatSource] = {}
             overrides = load_overrides(folder_path).data.get("items") or {}
 
@@ -289,17 +429,6 @@ class ConversationScanner:
 
             # Since this export doesn't include an explicit project_uuid on conversations,
             # we classify each conversation into exactly one project using text overlap.
-            ascii_re = re.compile(r"[0-9A-Za-z]{2,}")
-
-            def _is_cjk(ch: str) -> bool:
-                return "\u4e00" <= ch <= "\u9fff"
-
-            def _tokens(s: str) -> Tuple[set, set]:
-                s = (s or "").lower()
-                ascii_toks = set(ascii_re.findall(s))
-                cjk = {ch for ch in s if _is_cjk(ch)}
-                return ascii_toks, cjk
-
             project_profiles = []
             for pr in projects_sorted:
                 # Use a compact profile; long prompt templates/memories can swamp scoring.
@@ -319,27 +448,27 @@ class ConversationScanner:
 
             if not project_profiles:
                 # Fallback: keep everything under a single bucket.
-                project_profiles = [{'uuid': '', 'name': 'Claude', 'ascii': set(), 'cjk': set()}]
+                project_profiles = [{'uuid': '', 'name': 'Claude', 'ascii': frozenset(), 'cjk': frozenset()}]
 
             # Ensure every project exists as a category, and pin “（项目设定）” as the first entry.
             for p in project_profiles:
                 proj_name = p.get('name') or 'Claude'
                 proj_uuid = p.get('uuid') or ''
-                cat = f"项目/{proj_name}".strip()
+                cat = sys.intern(f"项目/{proj_name}".strip())
                 pid = f"project__{proj_uuid or proj_name}"
                 sort_time = p.get('updated_at') or p.get('created_at') or 0.0
+                title = f"（项目设定）{proj_name}"
 
+                sort_keys.setdefault(cat, []).append((1, sort_time, title))
                 listing.setdefault(cat, []).append({
                     'id': pid,
-                    'title': f"（项目设定）{proj_name}",
+                    'title': title,
                     'category': cat,
                     'project_uuid': proj_uuid,
                     'project_name': proj_name,
                     'update_time': p.get('updated_at'),
                     'create_time': p.get('created_at'),
                     'can_edit': False,
-                    '_sort_time': sort_time,
-                    '_pinned': 1,
                 })
                 lookup[(cat, pid)] = ChatSource(
                     kind='claude_project',
@@ -350,48 +479,6 @@ class ConversationScanner:
                     extra={'project_uuid': proj_uuid, 'project_name': proj_name},
                 )
 
-            def _first_user_snippet(conv_raw: Dict[str, Any]) -> str:
-                msgs = conv_raw.get('chat_messages')
-                if not isinstance(msgs, list):
-                    return ''
-                for m in msgs:
-                    if not isinstance(m, dict):
-                        continue
-                    sender = (m.get('sender') or '').strip().lower()
-                    if sender not in {'human', 'user'}:
-                        continue
-                    t = m.get('text')
-                    if isinstance(t, str) and t.strip():
-                        return re.sub(r"\s+", " ", t).strip()[:80]
-                    cl = m.get('content')
-                    if isinstance(cl, list):
-                        for part in cl:
-                            if isinstance(part, dict) and isinstance(part.get('text'), str) and part.get('text').strip():
-                                return re.sub(r"\s+", " ", part.get('text')).strip()[:80]
-                return ''
-
-            def _conv_text(conv_raw: Dict[str, Any]) -> str:
-                # Only use title+summary for project assignment to avoid content-based skew.
-                out = []
-                name = conv_raw.get('name')
-                summary = conv_raw.get('summary')
-                if isinstance(name, str) and name.strip():
-                    out.append(name)
-                if isinstance(summary, str) and summary.strip():
-                    out.append(summary)
-                return "\n".join(out)
-
-            def _score(conv_ascii: set, conv_cjk: set, p: Dict[str, Any]) -> float:
-                # Normalize overlap so large project profiles don't dominate.
-                a_i = len(conv_ascii & p['ascii'])
-                a_u = len(conv_ascii | p['ascii'])
-                c_i = len(conv_cjk & p['cjk'])
-                c_u = len(conv_cjk | p['cjk'])
-
-                a_sim = (a_i / a_u) if a_u else 0.0
-                c_sim = (c_i / c_u) if c_u else 0.0
-                return 4.0 * a_sim + 1.0 * c_sim
-
             for rec in claude_cache.conversations:
                 conv_raw = rec.raw
 
@@ -436,7 +523,7 @@ class ConversationScanner:
 
                 proj_name = (best or {}).get('name') or 'Claude'
                 proj_uuid = (best or {}).get('uuid') or ''
-                cat = f"项目/{proj_name}".strip()
+                cat = sys.intern(f"项目/{proj_name}".strip())
 
                 title = str(rec.name or '').strip()
                 if not title or title.lower() == 'untitled':
@@ -450,6 +537,7 @@ class ConversationScanner:
                     if isinstance(t2, str) and t2.strip():
                         title = t2.strip()
 
+                sort_keys.setdefault(cat, []).append((0, sort_time, title))
                 listing.setdefault(cat, []).append({
                     'id': rec.uuid,
                     'title': title,
@@ -459,7 +547,6 @@ class ConversationScanner:
                     'update_time': rec.updated_at,
                     'create_time': rec.created_at,
                     'can_edit': True,
-                    '_sort_time': sort_time,
                 })
                 lookup[(cat, rec.uuid)] = ChatSource(
                     kind='claude',
@@ -472,10 +559,7 @@ class ConversationScanner:
 
             # Sort items within each category.
             for cat, items in list(listing.items()):
-                items.sort(key=lambda x: (x.get('_pinned') or 0, x.get('_sort_time') or 0.0, x.get('title') or ''), reverse=True)
-                for it in items:
-                    it.pop('_sort_time', None)
-                    it.pop('_pinned', None)
+                listing[cat] = _sorted_by_keys(items, sort_keys[cat])
 
             cached = {
                 'kind': 'claude',
@@ -485,7 +569,7 @@ class ConversationScanner:
                 'listing': listing,
                 'lookup': lookup,
             }
-            self._special_cache[cache_key] = cached
+            self._store_special(cache_key, gen, cached)
             return cached
 
         if kind == 'gemini':
@@ -498,10 +582,12 @@ class ConversationScanner:
 
             gemini_cache: GeminiActivityCache = load_gemini_activity(folder_name=cache_key, folder_path=folder_path)
             items = []
+            item_keys: List[tuple] = []
             lookup: Dict[Tuple[str, str], ChatSource] = {}
 
             for rec in gemini_cache.records:
                 sort_time = rec.updated_at or rec.created_at or 0.0
+                item_keys.append((sort_time, rec.title or ''))
                 items.append({
                     'id': rec.chat_id,
                     'title': rec.title,
@@ -509,7 +595,6 @@ class ConversationScanner:
                     'update_time': rec.updated_at,
                     'create_time': rec.created_at,
                     'can_edit': False,
-                    '_sort_time': sort_time,
                 })
                 lookup[('全部', rec.chat_id)] = ChatSource(
                     kind='gemini',
@@ -520,9 +605,7 @@ class ConversationScanner:
                     extra={'chat_id': rec.chat_id},
                 )
 
-            items.sort(key=lambda x: (x.get('_sort_time') or 0.0, x.get('title') or ''), reverse=True)
-            for it in items:
-                it.pop('_sort_time', None)
+            items = _sorted_by_keys(items, item_keys)
 
             cached = {
                 'kind': 'gemini',
@@ -532,43 +615,53 @@ class ConversationScanner:
                 'listing': {'全部': items},
                 'lookup': lookup,
             }
-            self._special_cache[cache_key] = cached
+            self._store_special(cache_key, gen, cached)
             return cached
 
         return None
+
+    def _store_special(self, cache_key: str, gen: int, cached: Dict[str, Any]) -> None:
+        """Cache a Claude/Gemini listing unless an invalidation happened since `gen` was read.
+
+        The listing applies the overrides file as of load time; after a rename/delete
+        clear_cache()/invalidate_folder() bumps the generation, so a load that overlapped it
+        must not be stored (it would be reused until the export's mtime changes).
+        """
+        with self._cache_lock:
+            if self._cache_gen == gen:
+                self._special_cache[cache_key] = cached
     
     def _start_file_watcher(self):
-        """启动文件监听"""
-        roots = sorted(
-            {str(b.resolved_path) for b in self._folder_bindings.values() if b.resolved_path.exists() and b.resolved_path.is_dir()}
-        )
+        """启动文件监听（后台线程定期比较各文件夹的 JSON 文件指纹）"""
+        roots = {
+            b.id: str(b.resolved_path)
+            for b in self._folder_bindings.values()
+            if b.resolved_path.exists() and b.resolved_path.is_dir()
+        }
         if not roots:
             print("[scanner] no watchable source folders, skip file watcher")
             return
 
-        event_handler = DataFileHandler(self)
-        last_error = None
-        for observer_cls in (Observer, PollingObserver):
-            obs = None
-            try:
-                obs = observer_cls()
-                for root in roots:
-                    obs.schedule(event_handler, root, recursive=True)
-                obs.start()
-                self._observer = obs
-                print(f"[scanner] file watcher started ({observer_cls.__name__}): {', '.join(roots)}")
-                return
-            except Exception as e:
-                last_error = e
-                try:
-                    if obs:
-                        obs.stop()
-                        obs.join()
-                except Exception:
-                    pass
-
-        print(f"[scanner] failed to start file watcher: {last_error}")
-        self._observer = None
+        stop = threading.Event()
+        t = threading.Thread(target=self._poll_loop, args=(roots, stop), name="scanner-watcher", daemon=True)
+        self._watch_stop = stop
+        self._watch_thread = t
+        t.start()
+        print(f"[scanner] file watcher started (polling every {_WATCH_POLL_SEC:g}s): {', '.join(sorted(set(roots.values())))}")
+
+    def _poll_loop(self, roots: Dict[str, str], stop: threading.Event) -> None:
+        """Invalidate a folder's cached listing whenever its JSON fingerprint changes."""
+        last: Dict[str, bytes] = {fid: _compute_root_hash(root) for fid, root in roots.items()}
+        while not stop.wait(_WATCH_POLL_SEC):
+            for fid, root in roots.items():
+                if stop.is_set():
+                    return
+                h = _compute_root_hash(root)
+                if h == last.get(fid):
+                    continue
+                last[fid] = h
+                print(f"[scanner] detected file change: {fid}")
+                self.invalidate_folder(fid)
 
     def _restart_file_watcher(self):
         self.stop_watcher()
@@ -576,22 +669,38 @@ class ConversationScanner:
 
     def clear_cache(self):
         """清除缓存"""
-        self._cache.clear()
-        self._special_cache.clear()
-        self._file_time_cache.clear()
+        with self._cache_lock:
+            self._cache_gen += 1
+            self._cache.clear()
+            self._special_cache.clear()
+            self._file_time_cache.clear()
+            self._folder_kind_cache.clear()
         print("[scanner] cache cleared")
-    
+
+    def invalidate_folder(self, folder_id: str) -> None:
+        """Drop cached listings for a single folder, keeping other folders warm."""
+        with self._cache_lock:
+            self._cache_gen += 1
+            self._cache.pop(folder_id, None)
+            self._special_cache.pop(folder_id, None)
+            b = self._folder_bindings.get(folder_id)
+            if b:
+                self._folder_kind_cache.pop(str(b.resolved_path), None)
+        print(f"[scanner] cache invalidated: {folder_id}")
+
     def stop_watcher(self):
         """停止文件监听"""
-        if self._observer:
+        if self._watch_thread:
             try:
-                self._observer.stop()
-                self._observer.join()
+                if self._watch_stop:
+                    self._watch_stop.set()
+                self._watch_thread.join(timeout=5.0)
                 print("[scanner] file watcher stopped")
             except Exception:
                 pass
             finally:
-                self._observer = None
+                self._watch_thread = None
+                self._watch_stop = None
     
     def get_available_folders(self) -> List[str]:
         """
@@ -635,9 +744,35 @@ class ConversationScanner:
         """
         # 检查缓存
         cache_key = folder_name or self.current_folder or 'default'
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+            scan_lock = self._scan_locks.setdefault(cache_key, threading.Lock())
+
+        # Single-flight: concurrent callers for the same folder wait here and reuse the result.
+        with scan_lock:
+            with self._cache_lock:
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    return cached
+                gen = self._cache_gen
+
+            result, cacheable = self._scan_folder_listing(folder_name)
+
+            # 缓存结果
+            if cacheable:
+                with self._cache_lock:
+                    if self._cache_gen == gen:
+                        self._cache[cache_key] = result
+            return result
+
+    def _scan_folder_listing(self, folder_name: Optional[str]) -> Tuple[Dict[str, List[Dict]], bool]:
+        """Build the category listing for a folder without touching `_cache`.
+
+        Returns:
+            (listing, cacheable) - cacheable is False when the folder could not be resolved.
+        """
         result = {}
         
         # 确定要使用的文件夹
@@ -650,17 +785,17 @@ class ConversationScanner:
             # 如果没有指定，使用第一个可用的文件夹
             entries = self.get_available_folder_entries()
             if not entries:
-                return result
+                return result, False
             first_id = entries[0].get("id")
             binding = self._resolve_folder_binding(str(first_id or ""))
             self.current_folder = str(first_id or "") if first_id else None
 
         if not binding:
-            return result
+            return result, False
 
         data_dir = binding.resolved_path
         if not data_dir.exists():
-            return result
+            return result, False
 
         # Special folders: Claude / Gemini takeout
         folder_id = str(binding.id)
@@ -670,12 +805,10 @@ class ConversationScanner:
             forced_kind=binding.kind,
         )
         if special and isinstance(special.get('listing'), dict):
-            listing = special.get('listing')
-            self._cache[cache_key] = listing
-            return listing
+            return special.get('listing'), True
         
         # 递归扫描所有JSON文件，构建分类索引
-        self._scan_recursive(data_dir, data_dir, result)
+        self._scan_iterative(data_dir, result)
         
         # 如果没有找到任何分类，可能所有文件都在根目录
         if not result:
@@ -683,10 +816,7 @@ class ConversationScanner:
             if conversations:
                 result['全部'] = conversations
         
-        # 缓存结果
-        self._cache[cache_key] = result
-        
-        return result
+        return result, True
 
     def resolve_chat_source(self, chat_id: str, category: str, folder_name: Optional[str] = None) -> ChatSource:
         """Resolve a chat request to a concrete source.
@@ -757,31 +887,59 @@ class ConversationScanner:
             forced_kind=binding.kind,
         )
     
-    def _scan_recursive(self, current_path: Path, root_path: Path, result: Dict[str, List[Dict]]):
+    def _scan_iterative(self, root_path: Path, result: Dict[str, List[Dict]]):
         """
-        递归扫描目录，收集所有JSON文件
+        扫描目录树，收集所有JSON文件（显式栈 + os.scandir，避免递归和 Path 构造）
         
         Args:
-            current_path: 当前扫描的目录
-            root_path: 根目录（用于计算相对路径）
+            root_path: 根目录（根目录下的文件不在这里处理，见 _scan_category）
             result: 结果字典，会被修改
         """
-        # 收集当前目录的所有JSON文件
-        json_files = list(current_path.glob("*.json"))
-        
-        if json_files:
+        root_s = str(root_path)
+        stack = [root_s]
+        while stack:
+            cur = stack.pop()
+            json_entries: List[os.DirEntry] = []
+            sub_dirs: List[str] = []
+            try:
+                with os.scandir(cur) as it:
+                    for entry in it:
+                        try:
+                            # Symlinked dirs are not followed (os.walk's followlinks=False): a link
+                            # back up the tree would otherwise loop until ELOOP.
+                            if entry.is_dir(follow_symlinks=False):
+                                sub_dirs.append(entry.path)
+                            elif os.path.normcase(entry.name).endswith('.json') and entry.is_file():
+                                json_entries.append(entry)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+            # Keep pre-order traversal (same category order as the old recursive scan).
+            stack.extend(reversed(sub_dirs))
+
+            # 根目录的文件，暂不添加，等最后统一处理
+            if not json_entries or cur == root_s:
+                continue
+
             # 计算分类名称（相对路径）
-            if current_path == root_path:
-                # 根目录的文件，暂不添加，等最后统一处理
-                pass
-            else:
-                relative_path = current_path.relative_to(root_path)
-                category_name = str(relative_path).replace('\\', '/')
-                
-                conversations = []
-                for json_file in json_files:
-                    title, conv_id = self._parse_filename(json_file.stem)
-                    update_time, create_time, sort_time = self._get_conversation_times(json_file)
+            category_name = sys.intern(cur[len(root_s) + 1:].replace('\\', '/'))
+
+            conversations = []
+            sort_keys: List[tuple] = []
+            dir_fd = self._open_dir_fd(Path(cur))
+            try:
+                for entry in json_entries:
+                    title, conv_id = self._parse_filename(os.path.splitext(entry.name)[0])
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        st = None
+                    update_time, create_time, sort_time = self._get_conversation_times(
+                        Path(entry.path), dir_fd=dir_fd, stat_result=st
+                    )
+                    sort_keys.append((sort_time, title))
                     conversations.append({
                         'id': conv_id,
                         'title': title,
@@ -789,19 +947,13 @@ class ConversationScanner:
                         'update_time': update_time,
                         'create_time': create_time,
                         'can_edit': True,
-                        '_sort_time': sort_time,
                     })
+            finally:
+                if dir_fd is not None:
+                    os.close(dir_fd)
 
-                # ChatGPT web sorts by conversation time (most recently updated first)
-                conversations.sort(key=lambda x: (x.get('_sort_time') or 0.0, x.get('title') or ''), reverse=True)
-                for c in conversations:
-                    c.pop('_sort_time', None)
-                result[category_name] = conversations
-        
-        # 递归扫描子目录
-        for item in current_path.iterdir():
-            if item.is_dir():
-                self._scan_recursive(item, root_path, result)
+            # ChatGPT web sorts by conversation time (most recently updated first)
+            result[category_name] = _sorted_by_keys(conversations, sort_keys)
     
     def _scan_category(self, category_path: Path) -> List[Dict]:
         """
@@ -814,11 +966,13 @@ class ConversationScanner:
             [{'id': 'xxx', 'title': 'xxx', 'category': '全部'}, ...]
         """
         conversations = []
+        sort_keys: List[tuple] = []
         
         # 遍历该目录下的所有 JSON 文件（不递归）
         for json_file in category_path.glob("*.json"):
             title, conv_id = self._parse_filename(json_file.stem)
             update_time, create_time, sort_time = self._get_conversation_times(json_file)
+            sort_keys.append((sort_time, title))
             conversations.append({
                 'id': conv_id,
                 'title': title,
@@ -826,27 +980,119 @@ class ConversationScanner:
                 'update_time': update_time,
                 'create_time': create_time,
                 'can_edit': True,
-                '_sort_time': sort_time,
             })
         
         # 按对话时间排序（最近优先）
-        conversations.sort(key=lambda x: (x.get('_sort_time') or 0.0, x.get('title') or ''), reverse=True)
-        for c in conversations:
-            c.pop('_sort_time', None)
-        
-        return conversations
+        return _sorted_by_keys(conversations, sort_keys)
+
+    @staticmethod
+    def _open_dir_fd(dir_path: Path) -> Optional[int]:
+        """Open a directory fd for relative header reads, or None when unsupported."""
+        if not _DIR_FD_READS:
+            return None
+        try:
+            return os.open(dir_path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+        except OSError:
+            return None
+
+    def _scan_header_times(
+        self,
+        buf: bytes,
+        update_time: Optional[float],
+        create_time: Optional[float],
+        partial: bool = False,
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """Fill in whichever of update_time/create_time is still missing from `buf` (first hit wins).
+
+        `partial` marks `buf` as a prefix cut off mid-file: a number running up to its end may be
+        truncated, so it is left missing for the caller to read further and rescan. That includes
+        a number cut right after its decimal point ("1700000000." + "987" in the next block),
+        which the regex matches without the dot.
+        """
+        for m in self._re_header_time.finditer(buf):
+            if partial and (m.end() == len(buf) or buf[m.end():] == b'.'):
+                break
+            key = m.group(1)
+            if key == b'update_time':
+                if update_time is None:
+                    try:
+                        update_time = float(m.group(2))
+                    except Exception:
+                        update_time = None
+            elif create_time is None:
+                try:
+                    create_time = float(m.group(2))
+                except Exception:
+                    create_time = None
+            if update_time is not None and create_time is not None:
+                break
+        return update_time, create_time
+
+    def _read_header_times(
+        self,
+        json_file: Path,
+        dir_fd: Optional[int] = None,
+    ) -> Tuple[bytes, Optional[float], Optional[float]]:
+        """Read update_time/create_time from the file header with one open.
+
+        Starts with a small probe and only extends the read to the full header when
+        either timestamp is still missing. Uses pread against `dir_fd` when given.
+
+        Returns:
+            (header bytes read, update_time, create_time)
+        """
+        if dir_fd is not None:
+            fd = os.open(json_file.name, os.O_RDONLY, dir_fd=dir_fd)
+            try:
+                return self._probe_header_times(lambda n, offset: os.pread(fd, n, offset))
+            finally:
+                os.close(fd)
+
+        with open(json_file, 'rb') as f:
+            def read_at(n: int, offset: int) -> bytes:
+                f.seek(offset)
+                return f.read(n)
+
+            return self._probe_header_times(read_at)
 
-    def _get_conversation_times(self, json_file: Path) -> Tuple[Optional[float], Optional[float], float]:
+    def _probe_header_times(
+        self, read_at: Callable[[int, int], bytes]
+    ) -> Tuple[bytes, Optional[float], Optional[float]]:
+        """Header probe shared by both read paths of `_read_header_times`.
+
+        `read_at(n, offset)` returns up to n bytes of the file starting at offset.
+        """
+        head = read_at(_HEADER_PROBE_BYTES, 0)
+        probe_full = len(head) == _HEADER_PROBE_BYTES
+        update_time, create_time = self._scan_header_times(head, None, None, partial=probe_full)
+        if (update_time is None or create_time is None) and probe_full:
+            head += read_at(_HEADER_READ_BYTES - _HEADER_PROBE_BYTES, _HEADER_PROBE_BYTES)
+            rescan_from = _HEADER_PROBE_BYTES - _HEADER_RESCAN_OVERLAP
+            update_time, create_time = self._scan_header_times(head[rescan_from:], update_time, create_time)
+        return head, update_time, create_time
+
+    def _get_conversation_times(
+        self,
+        json_file: Path,
+        dir_fd: Optional[int] = None,
+        stat_result: Optional[os.stat_result] = None,
+    ) -> Tuple[Optional[float], Optional[float], float]:
         """Try to read update_time/create_time from JSON header quickly.
 
+        Args:
+            json_file: JSON export path
+            dir_fd: optional fd of the parent directory (see `_open_dir_fd`)
+            stat_result: optional pre-fetched stat of `json_file`
+
         Returns:
             (update_time, create_time, sort_time)
         """
         update_time = None
         create_time = None
+        st = None
 
         try:
-            st = json_file.stat()
+            st = stat_result if stat_result is not None else json_file.stat()
             mtime = float(st.st_mtime)
             cached = self._file_time_cache.get(str(json_file))
             if cached and abs(cached[0] - mtime) < 1e-6:
@@ -856,35 +1102,20 @@ class ConversationScanner:
 
         try:
             # Read a limited prefix; exported files place title/create_time/update_time near the top.
-            with open(json_file, 'rb') as f:
-                head = f.read(64 * 1024)
-            text = head.decode('utf-8', errors='ignore')
-
-            m_upd = self._re_update_time.search(text)
-            if m_upd:
-                try:
-                    update_time = float(m_upd.group(1))
-                except Exception:
-                    update_time = None
-
-            m_cre = self._re_create_time.search(text)
-            if m_cre:
-                try:
-                    create_time = float(m_cre.group(1))
-                except Exception:
-                    create_time = None
+            head, update_time, create_time = self._read_header_times(json_file, dir_fd=dir_fd)
 
             # Gemini batchexecute exports typically don't include numeric create/update_time.
             # Prefer extracting actual turn timestamps; fall back to fetched_at (ISO string).
-            if update_time is None and create_time is None and '"batchexecute_raw"' in text:
-                upd, cre = self._fast_extract_batchexecute_times(json_file, head)
+            if update_time is None and create_time is None and b'"batchexecute_raw"' in head:
+                size = int(st.st_size) if st is not None else None
+                upd, cre = self._fast_extract_batchexecute_times(json_file, head, size=size)
                 update_time = upd if isinstance(upd, (int, float)) else None
                 create_time = cre if isinstance(cre, (int, float)) else None
 
                 if update_time is None and create_time is None:
-                    m_fetched = self._re_fetched_at.search(text)
+                    m_fetched = self._re_fetched_at.search(head)
                     if m_fetched:
-                        ts = self._iso_to_epoch_seconds(m_fetched.group(1))
+                        ts = self._iso_to_epoch_seconds(m_fetched.group(1).decode('utf-8', errors='ignore'))
                         if ts:
                             update_time = ts
         except Exception:
@@ -898,6 +1129,8 @@ class ConversationScanner:
             sort_time = float(update_time)
         elif create_time is not None:
             sort_time = float(create_time)
+        elif mtime is not None:
+            sort_time = mtime
         else:
             sort_time = 0.0
             try:
@@ -908,7 +1141,8 @@ class ConversationScanner:
         try:
             if mtime is None:
                 mtime = float(json_file.stat().st_mtime)
-            self._file_time_cache[str(json_file)] = (float(mtime), update_time, create_time, float(sort_time))
+            with self._cache_lock:
+                self._file_time_cache[str(json_file)] = (float(mtime), update_time, create_time, float(sort_time))
         except Exception:
             pass
 
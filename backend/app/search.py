@@ -2,142 +2,115 @@
 
 from __future__ import annotations
 
-import json
 import atexit
+from array import array
+import bisect
+import hashlib
+import heapq
+import itertools
+import mmap
+import multiprocessing
 import os
-import re
+import struct
+import sys
+import tempfile
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+import orjson
+from pyroaring import BitMap
+
+from config import Config
 from app.scanner import scanner
-from app.normalize import (
-    extract_search_text_from_normalized,
-    normalize_claude_conversation,
-    normalize_claude_project,
-    normalize_gemini_activity,
+from app.external_sources import GeminiConversationRecord
+# Parse-worker entry points and the tokenizer live in search_parse, which spawned workers
+# import without pulling in this module (and the scanner it builds).
+from app.search_parse import (
+    _ASCII_TOKEN_RE,
+    _CJK_BIGRAM_RE,
+    _CJK_RUN_RE,
+    _ClaudePayload,
+    _claude_record_text,
+    _export_doc_text,
+    _gemini_record_text,
+    _normalize_space,
+    _parse_one,
+    _parse_special,
 )
-from app.gemini_batchexecute import is_gemini_batchexecute_export, extract_gemini_batchexecute_text
 
 
-_ASCII_TOKEN_RE = re.compile(r"[0-9A-Za-z]{2,}")
 _ASCII_PREFIX_MIN_LEN = 3
 _ASCII_PREFIX_MAX_LEN = 8
+# Folders with fewer docs than this are parsed in-process; worker start-up would dominate.
+_PARALLEL_PARSE_MIN_DOCS = 64
 _ASCII_STOPWORDS = {
     "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
     "of", "on", "or", "that", "the", "this", "to", "with",
 }
 
 
-def _is_cjk(ch: str) -> bool:
-    # 常用汉字区（覆盖大多数中文）
-    return "\u4e00" <= ch <= "\u9fff"
-
-
-def _normalize_space(s: str) -> str:
-    s = (s or "").strip()
-    return re.sub(r"\s+", " ", s)
-
-
 def _normalize_query(q: str) -> str:
     return _normalize_space(q).lower()
 
 
-def _parse_filename(stem: str) -> Tuple[str, str]:
-    parts = stem.rsplit('_', 1)
-    if len(parts) == 2:
-        return parts[0], parts[1]
-    return stem, stem
-
+def _claude_payload(special: Dict, chat_id: str) -> Optional[_ClaudePayload]:
+    claude_cache = special.get('claude_cache')
+    if not claude_cache:
+        return None
+    if chat_id.startswith('project__'):
+        pr = getattr(claude_cache, 'by_project_uuid', {}).get(chat_id[len('project__'):])
+        if not pr:
+            return None
+        return pr.raw, (getattr(pr, 'memory', '') or '')
+    rec = getattr(claude_cache, 'by_uuid', {}).get(chat_id)
+    if rec is None:
+        return None
+    return rec.raw, None
 
-def _looks_like_chatgpt_conversation_json(path: Path) -> bool:
-    """Fast sniffing to avoid loading huge non-conversation JSON blobs (primarily JSON arrays).
-
-    We accept any JSON object and let the slow path (json.load + schema checks) decide whether
-    it is indexable. Rejecting objects here can easily drop valid exports with alternate schemas
-    (e.g. Gemini per-conversation dumps).
-    """
-    try:
-        with open(path, "rb") as f:
-            head = f.read(64 * 1024)
-        if not head:
-            return False
-
-        # Find first non-whitespace byte
-        first = None
-        for b in head:
-            if b not in b" \t\r\n":
-                first = b
-                break
-        if first is None:
-            return False
 
-        # Many batch exports are JSON arrays; our indexer only supports per-conversation objects here.
-        if first == ord(b"["):
-            return False
+def _gemini_record(special: Dict, chat_id: str) -> Optional[GeminiConversationRecord]:
+    gemini_cache = special.get('gemini_cache')
+    return getattr(gemini_cache, 'by_id', {}).get(chat_id) if gemini_cache else None
 
-        return first == ord(b"{")
-    except Exception:
-        # If sniffing fails, fall back to the old behavior (attempt to load/parse).
-        return True
 
+def _special_doc_text(kind: str, special: Dict, chat_id: str, title: str, folder: str) -> Optional[str]:
+    """Searchable text of one Claude/Gemini conversation from the scanner's special cache."""
+    if kind == 'claude':
+        payload = _claude_payload(special, chat_id)
+        return _claude_record_text(payload, title) if payload is not None else None
+    rec = _gemini_record(special, chat_id)
+    return _gemini_record_text(rec, folder) if rec is not None else None
 
-def _extract_search_text(json_data: Dict) -> str:
-    """从导出的对话 JSON 中提取可搜索的纯文本。"""
-    out: List[str] = []
 
-    # Gemini per-conversation export (batchexecute wrapper)
-    if is_gemini_batchexecute_export(json_data):
-        return extract_gemini_batchexecute_text(json_data)
+def _walk_json(root: str) -> Iterator[os.DirEntry]:
+    """Yield `*.json` files under `root` via os.scandir, in the same order as Path.rglob.
 
-    title = json_data.get('title')
-    if isinstance(title, str) and title.strip():
-        out.append(title.strip())
-
-    mapping = json_data.get('mapping', {})
-    if not isinstance(mapping, dict):
-        return "\n".join(out)
-
-    for node in mapping.values():
-        if not isinstance(node, dict):
-            continue
-        message = node.get('message')
-        if not isinstance(message, dict):
-            continue
-
-        content = message.get('content', {})
-        if not isinstance(content, dict):
+    Pre-order: a directory's files first, then its subdirectories in listing order.
+    Symlinked directories are not followed (matching rglob).
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
             continue
-
-        # 最常见：content.parts
-        parts = content.get('parts')
-        if isinstance(parts, list):
-            for p in parts:
-                if isinstance(p, str) and p:
-                    out.append(p)
-
-        # 一些类型：content.text / content.content
-        for k in ('text', 'content'):
-            v = content.get(k)
-            if isinstance(v, str) and v:
-                out.append(v)
-
-        # thoughts: [{content, summary, ...}, ...]
-        if content.get('content_type') == 'thoughts':
-            thoughts = content.get('thoughts')
-            if isinstance(thoughts, list):
-                for t in thoughts:
-                    if not isinstance(t, dict):
-                        continue
-                    for k in ('content', 'summary'):
-                        v = t.get(k)
-                        if isinstance(v, str) and v:
-                            out.append(v)
-
-    return "\n".join(out)
+        subdirs: List[str] = []
+        for entry in entries:
+            try:
+                if entry.is_dir() and not entry.is_symlink():
+                    subdirs.append(entry.path)
+                elif os.path.normcase(entry.name).endswith(".json") and entry.is_file():
+                    yield entry
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
 
 
 @dataclass(frozen=True)
@@ -146,23 +119,455 @@ class SearchDoc:
     category: str
     title: str
     file_path: str
-    text_norm: str
-    text_view: str
+    # _normalize_query(title), precomputed so scoring doesn't re-normalize per query.
+    title_norm: str
+    # Only the lowercased text is kept, and not on the heap: it is UTF-8 bytes
+    # [text_off, text_off + text_len) of the index's text_buf, text_chars code points long.
+    # Original-case snippet text is reloaded on demand for returned hits
+    # (see ConversationSearcher._doc_text_view).
+    text_off: int
+    text_len: int
+    text_chars: int
 
 
 class FolderSearchIndex:
     def __init__(self, folder: str, folder_path: Path):
         self.folder = folder
         self.folder_path = folder_path
+        # 'claude' / 'gemini' for special container folders, '' for per-file exports.
+        self.kind = ""
         self.docs: List[SearchDoc] = []
-        self.token_index: Dict[str, Set[int]] = {}
-        # Prefix postings for incremental search (e.g. "dimensiona" -> "dimensional").
-        # We only store a limited prefix range to keep memory bounded.
-        self.token_prefix_index: Dict[str, Set[int]] = {}
-        self.cjk_char_index: Dict[str, Set[int]] = {}
+        # Postings are Roaring bitmaps of doc indexes: compact for large folders and
+        # intersected in C. While building, token_index / cjk_build collect each term's doc
+        # indexes in an array('I') (appends are cheaper than BitMap.add); _finalize_postings
+        # turns them into bitmaps and empties both.
+        self.token_index: Dict[str, array] = {}
+        self.cjk_build: Dict[str, array] = {}
+        # Sorted tokens for exact and incremental prefix search (e.g. "dimensiona" -> "dimensional").
+        # CJK bigrams live here too: they never collide with (or prefix-match) ASCII tokens.
+        # Token i's serialized posting is postings_buf[postings_off[i]:postings_off[i + 1]].
+        self.sorted_tokens: List[str] = []
+        self.postings_buf = b""
+        self.postings_off = array("Q", [0])
+        self.cjk_char_index: Dict[str, BitMap] = {}
+        # Lowercased doc texts in doc order, spilled to an anonymous temp file while building
+        # and memory-mapped by _finalize_postings, so the OS page cache rather than the heap
+        # holds them. Substring checks run as text_buf.find(needle, start, end).
+        self.text_file = None
+        self.text_size = 0
+        self.text_buf = b""
+        # Each doc's text_off in doc order, for mapping a text_buf offset back to its doc.
+        self.text_starts = array("Q")
+        # All docs' title_norm joined by "\n" (never inside a normalized title or query), with
+        # the start offset of each; lets title matching scan every title in one C-level pass.
+        self.titles_blob = ""
+        self.title_starts = array("Q")
+        # LRU of resolved query-token postings (exact hit or prefix union), so repeated and
+        # overlapping queries skip the bisect + deserialize work. Lives and dies with the index.
+        self.term_cache: OrderedDict[str, Optional[BitMap]] = OrderedDict()
+        self.term_cache_lock = threading.Lock()
+        # Per-file exports: path -> (st_mtime_ns, st_size, doc index or -1 if not indexable), so
+        # a rebuild only re-parses files that changed (see _update_index).
+        self.file_meta: Dict[str, Tuple[int, int, int]] = {}
+        # Docs whose file changed or disappeared after an incremental update; their postings
+        # stay in place and they are filtered out of every search instead.
+        self.dead = BitMap()
         self.built_at = 0.0
 
 
+def _finalize_postings(idx: FolderSearchIndex, base: Optional[FolderSearchIndex] = None) -> None:
+    """Compact postings once a build is done; they are read-only until the next rebuild.
+
+    Token postings (the long tail of rare terms) are packed into one serialized buffer
+    addressed by token rank, dropping a BitMap object and a dict slot per term.
+    CJK postings are few and hot, so they stay as live bitmaps.
+    With `base` (incremental update), the build postings only hold the newly added docs and
+    are merged into base's: untouched tokens are copied over slice by slice, untouched CJK
+    bitmaps are shared (neither index mutates them).
+    """
+    cjk_index = dict(base.cjk_char_index) if base is not None else {}
+    for ch, ids in idx.cjk_build.items():
+        # Doc indexes were appended in increasing order, so this is a single bulk load.
+        posting = BitMap(ids)
+        if ch in cjk_index:
+            posting |= cjk_index[ch]
+        # Runs of consecutive doc indexes (common chars) collapse into run containers.
+        posting.run_optimize()
+        posting.shrink_to_fit()
+        cjk_index[ch] = posting
+    idx.cjk_char_index = cjk_index
+    idx.cjk_build = {}
+
+    base_tokens = base.sorted_tokens if base is not None else []
+    base_off = base.postings_off if base is not None else array("Q", [0])
+    base_buf = memoryview(base.postings_buf if base is not None else b"")
+    tokens: List[str] = []
+    chunks: List = []
+    offsets = array("Q", [0])
+    end = 0
+
+    def copy_base(i: int, j: int) -> None:
+        # Base tokens [i, j) are untouched: one buffer slice, offsets shifted in bulk.
+        nonlocal end
+        if j <= i:
+            return
+        shift = end - base_off[i]
+        tokens.extend(base_tokens[i:j])
+        chunks.append(base_buf[base_off[i]:base_off[j]])
+        offsets.extend(o + shift for o in base_off[i + 1:j + 1])
+        end = offsets[-1]
+
+    i = 0
+    for tok in sorted(idx.token_index):
+        posting = BitMap(idx.token_index[tok])
+        j = bisect.bisect_left(base_tokens, tok, i)
+        copy_base(i, j)
+        if j < len(base_tokens) and base_tokens[j] == tok:
+            posting |= BitMap.deserialize(base_buf[base_off[j]:base_off[j + 1]])
+            j += 1
+        i = j
+        posting.run_optimize()
+        data = posting.serialize()
+        tokens.append(tok)
+        chunks.append(data)
+        end += len(data)
+        offsets.append(end)
+    copy_base(i, len(base_tokens))
+
+    idx.sorted_tokens = tokens
+    idx.postings_buf = b"".join(chunks)
+    idx.postings_off = offsets
+    idx.token_index = {}
+    _finalize_docs(idx)
+
+
+def _finalize_docs(idx: FolderSearchIndex) -> None:
+    """Build the per-doc lookup tables and map the spilled texts."""
+    starts = array("Q")
+    end = 0
+    for doc in idx.docs:
+        starts.append(end)
+        end += len(doc.title_norm) + 1
+    idx.titles_blob = "\n".join(doc.title_norm for doc in idx.docs)
+    idx.title_starts = starts
+    idx.text_starts = array("Q", (doc.text_off for doc in idx.docs))
+
+    if idx.text_file is not None and idx.text_size:
+        idx.text_file.flush()
+        try:
+            idx.text_buf = mmap.mmap(idx.text_file.fileno(), idx.text_size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # e.g. no address space for the mapping: keep the texts in memory instead.
+            idx.text_file.seek(0)
+            idx.text_buf = idx.text_file.read(idx.text_size)
+
+
+# Bump whenever what gets indexed changes (text extraction, normalization, terms), so
+# snapshots written by older code are ignored instead of reused.
+_SNAPSHOT_VERSION = 1
+_SNAPSHOT_MAGIC = b"UCSIDX\n"
+_SNAPSHOT_COPY_CHUNK = 1 << 20
+# Serializes snapshot writes; they run on background threads after a build is swapped in.
+_snapshot_lock = threading.Lock()
+
+
+def _snapshot_path(folder_path: Path) -> Optional[Path]:
+    cache_dir = getattr(Config, "SEARCH_CACHE_DIR_PATH", None)
+    if not cache_dir:
+        return None
+    key = hashlib.blake2b(str(folder_path).encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+    return Path(cache_dir) / f"{key}.idx"
+
+
+def _save_snapshot(idx: FolderSearchIndex) -> None:
+    """Persist a per-file folder's index so a restart only re-parses files changed since.
+
+    Layout: magic, 8-byte header length, orjson header, then the raw sections it sizes
+    (packed token postings, their offsets, packed CJK postings, spilled texts). Plain data
+    only (no pickle), written to a temp file and renamed into place.
+    """
+    path = _snapshot_path(idx.folder_path)
+    if path is None:
+        return
+    cjk_chars = list(idx.cjk_char_index)
+    cjk_data = [idx.cjk_char_index[ch].serialize() for ch in cjk_chars]
+    offsets = idx.postings_off.tobytes()
+    header = orjson.dumps({
+        "version": _SNAPSHOT_VERSION,
+        "folder_path": str(idx.folder_path),
+        "byteorder": sys.byteorder,
+        "docs": [
+            [d.chat_id, d.category, d.title, d.file_path, d.text_off, d.text_len, d.text_chars]
+            for d in idx.docs
+        ],
+        "file_meta": idx.file_meta,
+        "dead": list(idx.dead),
+        "tokens": idx.sorted_tokens,
+        "cjk": cjk_chars,
+        "cjk_lens": [len(data) for data in cjk_data],
+        "sizes": [len(idx.postings_buf), len(offsets), sum(map(len, cjk_data)), idx.text_size],
+    })
+    tmp_name = None
+    try:
+        with _snapshot_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as f:
+                tmp_name = f.name
+                f.write(_SNAPSHOT_MAGIC)
+                f.write(struct.pack("<Q", len(header)))
+                f.write(header)
+                f.write(idx.postings_buf)
+                f.write(offsets)
+                for data in cjk_data:
+                    f.write(data)
+                if idx.text_size:
+                    with memoryview(idx.text_buf) as view:
+                        f.write(view[:idx.text_size])
+            os.replace(tmp_name, path)
+            tmp_name = None
+    except Exception as e:
+        print(f"[search] failed to save index snapshot for {idx.folder}: {e}")
+    finally:
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+
+def _prune_snapshots(keep_paths: Iterable[Path]) -> None:
+    """Delete snapshots of folders not in `keep_paths`, and temp files of interrupted saves."""
+    keep = {p.name for p in map(_snapshot_path, keep_paths) if p is not None}
+    cache_dir = getattr(Config, "SEARCH_CACHE_DIR_PATH", None)
+    if not cache_dir:
+        return
+    with _snapshot_lock:
+        try:
+            with os.scandir(cache_dir) as it:
+                names = [entry.name for entry in it]
+        except OSError:
+            return
+        for name in names:
+            # Saves hold _snapshot_lock, so any *.tmp seen here was left by a process that died mid-write.
+            if name.endswith(".tmp") or (name.endswith(".idx") and name not in keep):
+                try:
+                    os.unlink(os.path.join(cache_dir, name))
+                except OSError:
+                    pass
+
+
+def _load_snapshot(folder: str, folder_path: Path) -> Optional[FolderSearchIndex]:
+    """Index saved by _save_snapshot for this folder path, or None if missing/stale/corrupt.
+
+    File contents are not checked here: the result serves as the base of _update_index,
+    which re-parses every file whose mtime/size no longer match.
+    """
+    path = _snapshot_path(folder_path)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+                return None
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = orjson.loads(f.read(header_len))
+            if (
+                header.get("version") != _SNAPSHOT_VERSION
+                or header.get("folder_path") != str(folder_path)
+                or header.get("byteorder") != sys.byteorder
+            ):
+                return None
+            postings_len, offsets_len, cjk_len, text_len = header["sizes"]
+
+            idx = FolderSearchIndex(folder=folder, folder_path=folder_path)
+            idx.docs = [
+                SearchDoc(
+                    chat_id=chat_id,
+                    category=category,
+                    title=title,
+                    file_path=file_path,
+                    title_norm=_normalize_query(title),
+                    text_off=text_off,
+                    text_len=doc_len,
+                    text_chars=text_chars,
+                )
+                for chat_id, category, title, file_path, text_off, doc_len, text_chars in header["docs"]
+            ]
+            idx.file_meta = {p: tuple(meta) for p, meta in header["file_meta"].items()}
+            idx.dead = BitMap(header["dead"])
+            idx.sorted_tokens = header["tokens"]
+            idx.postings_buf = f.read(postings_len)
+            idx.postings_off = array("Q")
+            idx.postings_off.frombytes(f.read(offsets_len))
+            cjk_buf = memoryview(f.read(cjk_len))
+            if (
+                len(idx.postings_buf) != postings_len
+                or len(idx.postings_off) != len(idx.sorted_tokens) + 1
+                or len(cjk_buf) != cjk_len
+            ):
+                return None
+            pos = 0
+            for ch, size in zip(header["cjk"], header["cjk_lens"]):
+                idx.cjk_char_index[ch] = BitMap.deserialize(cjk_buf[pos:pos + size])
+                pos += size
+
+            # Copy the texts into a fresh spill file: later incremental updates append to it.
+            remaining = text_len
+            if remaining:
+                idx.text_file = tempfile.TemporaryFile()
+                while remaining:
+                    chunk = f.read(min(remaining, _SNAPSHOT_COPY_CHUNK))
+                    if not chunk:
+                        return None
+                    idx.text_file.write(chunk)
+                    remaining -= len(chunk)
+            idx.text_size = text_len
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[search] ignoring unreadable index snapshot for {folder}: {e}")
+        return None
+
+    _finalize_docs(idx)
+    idx.built_at = time.time()
+    return idx
+
+
+def _spill_text(idx: FolderSearchIndex, data: bytes) -> Tuple[int, int]:
+    """Append one doc's UTF-8 lowercased text to the index's spill file; returns (offset, length)."""
+    if idx.text_file is None:
+        idx.text_file = tempfile.TemporaryFile()
+    # Offsets come from the file position, not text_size: a shared spill file may already hold
+    # bytes past this index's text_size (texts of an update that failed after spilling).
+    off = idx.text_file.tell()
+    idx.text_file.write(data)
+    idx.text_size = off + len(data)
+    return off, len(data)
+
+
+def _doc_text(idx: FolderSearchIndex, doc: SearchDoc) -> str:
+    return idx.text_buf[doc.text_off:doc.text_off + doc.text_len].decode("utf-8", "surrogatepass")
+
+
+def _doc_find(idx: FolderSearchIndex, doc: SearchDoc, needle: bytes) -> int:
+    """Byte offset of `needle` in doc's lowercased text, or -1."""
+    p = idx.text_buf.find(needle, doc.text_off, doc.text_off + doc.text_len)
+    return p - doc.text_off if p >= 0 else -1
+
+
+def _text_hits(idx: FolderSearchIndex, candidates: BitMap, needle: bytes) -> Dict[int, int]:
+    """`{doc_index: first byte offset of needle}` for candidates whose text contains `needle`.
+
+    Scans text_buf in one pass of C-level finds, jumping to the next doc after each hit,
+    instead of one find call per candidate; meant for candidate sets covering most docs.
+    """
+    hits: Dict[int, int] = {}
+    buf = idx.text_buf
+    starts = idx.text_starts
+    docs = idx.docs
+    n = len(needle)
+    pos = buf.find(needle)
+    while pos >= 0:
+        di = bisect.bisect_right(starts, pos) - 1
+        doc = docs[di]
+        doc_end = doc.text_off + doc.text_len
+        # A match running past doc_end spans two docs (or starts in the unused gap an aborted
+        # update can leave between texts), and no later match in this doc can fit either.
+        if pos + n <= doc_end and di in candidates:
+            hits[di] = pos - doc.text_off
+        pos = buf.find(needle, max(doc_end, pos + 1))
+    return hits
+
+
+def _char_offset(idx: FolderSearchIndex, doc: SearchDoc, byte_pos: int) -> int:
+    return len(idx.text_buf[doc.text_off:doc.text_off + byte_pos].decode("utf-8", "surrogatepass"))
+
+
+def _title_hits(idx: FolderSearchIndex, candidates: BitMap, needle: str) -> BitMap:
+    """Candidates whose title_norm contains `needle` (which must not contain "\n").
+
+    Small candidate sets check their own titles; large ones scan titles_blob once instead
+    of looping over every candidate in Python.
+    """
+    docs = idx.docs
+    if len(candidates) * 8 <= len(docs):
+        return BitMap(di for di in candidates if needle in docs[di].title_norm)
+
+    hits = BitMap()
+    blob = idx.titles_blob
+    starts = idx.title_starts
+    pos = blob.find(needle)
+    while pos >= 0:
+        di = bisect.bisect_right(starts, pos) - 1
+        hits.add(di)
+        if di + 1 >= len(starts):
+            break
+        pos = blob.find(needle, starts[di + 1])
+    return hits & candidates
+
+
+def _decode_posting(idx: FolderSearchIndex, rank: int) -> BitMap:
+    off = idx.postings_off
+    return BitMap.deserialize(memoryview(idx.postings_buf)[off[rank]:off[rank + 1]])
+
+
+def _token_posting(idx: FolderSearchIndex, tok: str) -> Optional[BitMap]:
+    tokens = idx.sorted_tokens
+    i = bisect.bisect_left(tokens, tok)
+    if i < len(tokens) and tokens[i] == tok:
+        return _decode_posting(idx, i)
+    return None
+
+
+_TERM_CACHE_MAX = 256
+# Most tokens a query-token prefix is expanded to (see _prefix_posting).
+_PREFIX_EXPAND_MAX = 512
+# Largest result count search() returns (matches the /api/search limit clamp).
+_SEARCH_LIMIT_MAX = 200
+
+
+def _query_token_posting(idx: FolderSearchIndex, tok: str) -> Optional[BitMap]:
+    """Posting for one query token: exact match, else (len >= 3) the union of its prefix matches.
+
+    Returned bitmaps are shared through `idx.term_cache` and must not be mutated.
+    """
+    with idx.term_cache_lock:
+        if tok in idx.term_cache:
+            idx.term_cache.move_to_end(tok)
+            return idx.term_cache[tok]
+
+    posting = _token_posting(idx, tok)
+    if (not posting) and (len(tok) >= _ASCII_PREFIX_MIN_LEN):
+        key = tok if len(tok) <= _ASCII_PREFIX_MAX_LEN else tok[:_ASCII_PREFIX_MAX_LEN]
+        posting = _prefix_posting(idx, key)
+
+    with idx.term_cache_lock:
+        idx.term_cache[tok] = posting
+        while len(idx.term_cache) > _TERM_CACHE_MAX:
+            idx.term_cache.popitem(last=False)
+    return posting
+
+
+def _prefix_posting(idx: FolderSearchIndex, prefix: str) -> Optional[BitMap]:
+    """Union the postings of every indexed token starting with `prefix`.
+
+    A prefix matching more than _PREFIX_EXPAND_MAX tokens is not selective enough to be
+    worth the union: it gets a posting of every doc, i.e. it doesn't narrow the candidates
+    (the substring check still verifies each hit).
+    """
+    tokens = idx.sorted_tokens
+    lo = bisect.bisect_left(tokens, prefix)
+    # Tokens starting with `prefix` sort before prefix with its last char bumped by one.
+    hi = bisect.bisect_left(tokens, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+    if hi == lo:
+        return None
+    if hi - lo > _PREFIX_EXPAND_MAX:
+        everything = BitMap(range(len(idx.docs)))
+        everything.run_optimize()
+        return everything
+    return BitMap.union(*(_decode_posting(idx, i) for i in range(lo, hi)))
+
+
 class ConversationSearcher:
     """按 folder 构建/缓存索引，提供高速搜索。"""
 
@@ -178,24 +583,86 @@ class ConversationSearcher:
         # after the in-flight build finishes (avoids stale indexes).
         self._dirty: Set[str] = set()
         # Cache per-folder query results so polling (scope=all) doesn't redo expensive work.
-        self._search_cache: Dict[Tuple[str, str, int, float], List[Dict]] = {}
+        # LRU: hits move to the end, eviction pops the least recently used entry.
+        self._search_cache: OrderedDict[Tuple[str, str, int, float], List[Dict]] = OrderedDict()
         self._search_cache_max = 256
+        # LRU of original-case doc text for snippets, keyed by (folder, built_at, file_path, chat_id).
+        # Holds a full result page, so snippets of a max-limit query don't evict each other and
+        # force every hit's source to be re-parsed on the next query.
+        self._text_view_cache: OrderedDict[Tuple[str, float, str, str], str] = OrderedDict()
+        self._text_view_cache_max = _SEARCH_LIMIT_MAX
+        # Created lazily: only large ChatGPT folders fan JSON parsing out to processes.
+        self._parse_executor: Optional[ProcessPoolExecutor] = None
+        # Indexes dropped by invalidate(), kept as the base of the next (incremental) build.
+        self._stale_indexes: Dict[str, FolderSearchIndex] = {}
+        # Snapshot writes still in flight; joined at exit so no save is cut off mid-file.
+        self._snapshot_threads: List[threading.Thread] = []
+        # Stale snapshots are pruned once, before the first snapshot load of this process.
+        self._snapshots_pruned = False
 
     def _shutdown_executor(self) -> None:
-        try:
-            self._build_executor.shutdown(wait=False, cancel_futures=True)
-        except Exception:
+        for executor in (self._build_executor, self._parse_executor):
+            if executor is None:
+                continue
             try:
-                self._build_executor.shutdown(wait=False)
+                executor.shutdown(wait=False, cancel_futures=True)
             except Exception:
-                pass
+                try:
+                    executor.shutdown(wait=False)
+                except Exception:
+                    pass
+        with self._lock:
+            threads = list(self._snapshot_threads)
+        for t in threads:
+            t.join()
 
     @staticmethod
     def _default_build_workers() -> int:
-        # Index building is disk I/O + some CPU; too many threads increases contention.
+        # Threads only schedule folder builds: the CPU-bound JSON parsing, normalization and
+        # tokenization of every folder kind runs in _parse_executor processes. Building
+        # postings stays in-thread (GIL), so more threads would just contend.
         cpu = os.cpu_count() or 4
         return max(2, min(4, cpu // 2))
 
+    @staticmethod
+    def _default_parse_workers() -> int:
+        # JSON parsing + text extraction is CPU-bound (GIL), so use processes up to core count.
+        return max(1, min(os.cpu_count() or 1, 16))
+
+    def _parse_map(self, fn, *iterables: List) -> List:
+        """`[fn(*args) for args in zip(*iterables)]`, fanned out to worker processes for large
+        batches. `fn` must be a module-level function of app.search_parse (picklable, and
+        importable in a spawned worker without building the scanner). Keeps input order.
+        """
+        n = len(iterables[0]) if iterables else 0
+        if n >= _PARALLEL_PARSE_MIN_DOCS and self._default_parse_workers() > 1:
+            with self._lock:
+                if self._parse_executor is None:
+                    # spawn, not fork: the server process already runs threads (watcher, build
+                    # pool) whose locks a forked child could inherit held. Workers only import
+                    # app.search_parse, so start-up stays cheap and no scanner is built there.
+                    self._parse_executor = ProcessPoolExecutor(
+                        max_workers=self._default_parse_workers(),
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                executor = self._parse_executor
+            # Several chunks per worker keep the pool balanced; up to 32 docs per chunk
+            # amortizes pickling/IPC round trips on large folders.
+            chunksize = max(1, min(32, n // (self._default_parse_workers() * 4)))
+            try:
+                return list(executor.map(fn, *iterables, chunksize=chunksize))
+            except Exception as e:
+                # Broken pool (e.g. worker killed): drop it and parse in-process instead.
+                print(f"[search] parallel parse failed, falling back to serial: {e}")
+                with self._lock:
+                    if self._parse_executor is executor:
+                        self._parse_executor = None
+                try:
+                    executor.shutdown(wait=False)
+                except Exception:
+                    pass
+        return [fn(*args) for args in zip(*iterables)]
+
     def _submit_build(self, folder: str, folder_path: Path) -> None:
         try:
             self._build_executor.submit(self._build_index_safe, folder, folder_path)
@@ -217,7 +684,9 @@ class ConversationSearcher:
         if not folder:
             return
         with self._lock:
-            self._indexes.pop(folder, None)
+            stale = self._indexes.pop(folder, None)
+            if stale is not None:
+                self._stale_indexes[folder] = stale
             self._build_errors.pop(folder, None)
             self._dirty.add(folder)
             ev = self._build_events.get(folder)
@@ -234,6 +703,7 @@ class ConversationSearcher:
         """Drop all cached indexes."""
         with self._lock:
             self._indexes.clear()
+            self._stale_indexes.clear()
             self._build_errors.clear()
             self._dirty = set(self._build_events.keys())
             for ev in self._build_events.values():
@@ -293,9 +763,16 @@ class ConversationSearcher:
                 self._build_events[folder] = ev
 
             # 如果没在构建，就同步构建（保证搜索不出错）
-            if folder not in self._building:
+            build_now = folder not in self._building
+            if build_now:
                 self._building.add(folder)
-                self._build_index_safe(folder, folder_path)
+
+        if build_now:
+            # Build outside self._lock: the lock guards every folder's bookkeeping and the
+            # search cache, so holding it here would stall searches of all other folders.
+            # Concurrent callers for this folder see it in _building and wait on `ev`.
+            self._build_index_safe(folder, folder_path)
+            with self._lock:
                 idx = self._indexes.get(folder)
                 if not idx:
                     raise RuntimeError(self._build_errors.get(folder) or "index build failed")
@@ -341,10 +818,12 @@ class ConversationSearcher:
                 }
             raise
 
-        eff_limit = max(1, min(int(limit or 50), 200))
+        eff_limit = max(1, min(int(limit or 50), _SEARCH_LIMIT_MAX))
         cache_key = (folder, q_norm, eff_limit, float(getattr(idx, "built_at", 0.0) or 0.0))
         with self._lock:
             cached = self._search_cache.get(cache_key)
+            if cached is not None:
+                self._search_cache.move_to_end(cache_key)
         if cached is not None:
             results = cached
         else:
@@ -352,10 +831,7 @@ class ConversationSearcher:
             with self._lock:
                 self._search_cache[cache_key] = results
                 while len(self._search_cache) > self._search_cache_max:
-                    try:
-                        self._search_cache.pop(next(iter(self._search_cache)))
-                    except Exception:
-                        break
+                    self._search_cache.popitem(last=False)
         took_ms = int((time.perf_counter() - t0) * 1000)
 
         return {
@@ -363,7 +839,7 @@ class ConversationSearcher:
             'folder': folder,
             'ready': True,
             'results': results,
-            'stats': {'docCount': len(idx.docs), 'tookMs': took_ms},
+            'stats': {'docCount': len(idx.docs) - len(idx.dead), 'tookMs': took_ms},
         }
 
     def _build_index_safe(self, folder: str, folder_path: Path) -> None:
@@ -390,44 +866,88 @@ class ConversationSearcher:
             if should_rebuild:
                 self._submit_build(folder, folder_path)
 
-    def _rebuild_token_indexes(self, idx: FolderSearchIndex) -> None:
-        idx.token_index = {}
-        idx.token_prefix_index = {}
-        idx.cjk_char_index = {}
-
-        for doc_index, doc in enumerate(idx.docs):
-            blob_norm = doc.text_norm or ""
-
-            for tok in set(_ASCII_TOKEN_RE.findall(blob_norm)):
-                s = idx.token_index.get(tok)
-                if s is None:
-                    s = set()
-                    idx.token_index[tok] = s
-                s.add(doc_index)
-
-                if len(tok) >= _ASCII_PREFIX_MIN_LEN:
-                    max_len = min(_ASCII_PREFIX_MAX_LEN, len(tok))
-                    for plen in range(_ASCII_PREFIX_MIN_LEN, max_len + 1):
-                        p = tok[:plen]
-                        ps = idx.token_prefix_index.get(p)
-                        if ps is None:
-                            ps = set()
-                            idx.token_prefix_index[p] = ps
-                        ps.add(doc_index)
-
-            cjk_chars = {ch for ch in blob_norm if _is_cjk(ch)}
-            for ch in cjk_chars:
-                s = idx.cjk_char_index.get(ch)
-                if s is None:
-                    s = set()
-                    idx.cjk_char_index[ch] = s
-                s.add(doc_index)
+    def _doc_text_view(self, idx: FolderSearchIndex, doc: SearchDoc) -> str:
+        """Original-case text of `doc` for snippets, re-extracted from its source."""
+        key = (idx.folder, idx.built_at, doc.file_path, doc.chat_id)
+        with self._lock:
+            view = self._text_view_cache.get(key)
+            if view is not None:
+                self._text_view_cache.move_to_end(key)
+                return view
+
+        blob: Optional[str] = None
+        try:
+            if idx.kind in ('claude', 'gemini'):
+                special = scanner.get_special_folder_cache(idx.folder) or {}
+                blob = _special_doc_text(idx.kind, special, doc.chat_id, doc.title, idx.folder)
+            else:
+                blob = _export_doc_text(Path(doc.file_path), doc.title)
+        except Exception:
+            blob = None
+
+        view = _normalize_space(blob) if blob is not None else ""
+        if len(view) != doc.text_chars:
+            # Source changed since the build (or could not be read): match positions would
+            # no longer line up, so fall back to the indexed lowercased text.
+            view = _doc_text(idx, doc)
+
+        with self._lock:
+            self._text_view_cache[key] = view
+            while len(self._text_view_cache) > self._text_view_cache_max:
+                self._text_view_cache.popitem(last=False)
+        return view
+
+    @staticmethod
+    def _add_doc(
+        idx: FolderSearchIndex,
+        chat_id: str,
+        category: str,
+        title: str,
+        file_path: str,
+        text: bytes,
+        text_chars: int,
+        tokens: List[str],
+        cjk_chars: List[str],
+    ) -> None:
+        text_off, text_len = _spill_text(idx, text)
+        doc_index = len(idx.docs)
+        idx.docs.append(SearchDoc(
+            chat_id=chat_id,
+            category=category,
+            title=title,
+            file_path=file_path,
+            title_norm=_normalize_query(title),
+            text_off=text_off,
+            text_len=text_len,
+            text_chars=text_chars,
+        ))
+
+        # token 索引（英文/数字）
+        token_index = idx.token_index
+        for tok in tokens:
+            ids = token_index.get(tok)
+            if ids is None:
+                ids = token_index[tok] = array("I")
+            ids.append(doc_index)
+
+        # CJK 字符索引（中文）
+        # 用 unique 字符，避免重复添加
+        cjk_build = idx.cjk_build
+        for ch in cjk_chars:
+            ids = cjk_build.get(ch)
+            if ids is None:
+                ids = cjk_build[ch] = array("I")
+            ids.append(doc_index)
 
     def _build_index(self, folder: str, folder_path: Path) -> None:
         if not folder_path.exists() or not folder_path.is_dir():
             raise FileNotFoundError(f"folder not found: {folder}")
 
         new_idx = FolderSearchIndex(folder=folder, folder_path=folder_path)
+        with self._lock:
+            # The previous index (dropped by invalidate() or, on a dirty rebuild, still live)
+            # is the base for an incremental update of per-file folders.
+            base = self._stale_indexes.pop(folder, None) or self._indexes.get(folder)
 
         # Special folders (Claude/Gemini) are container formats, not one-conversation-per-file.
         # Ensure scanner has had a chance to detect/load special caches even if search is called first.
@@ -440,10 +960,13 @@ class ConversationSearcher:
             kind = special.get('kind')
             listing = special.get('listing') or {}
 
-            if kind == 'claude':
-                claude_cache = special.get('claude_cache')
-                by_uuid = getattr(claude_cache, 'by_uuid', {}) if claude_cache else {}
-                by_project_uuid = getattr(claude_cache, 'by_project_uuid', {}) if claude_cache else {}
+            if kind in ('claude', 'gemini'):
+                new_idx.kind = kind
+                src = str(special.get('src') or '')
+                # Resolve records here (the caches live in this process), then normalize and
+                # tokenize them through the same worker pool as per-file exports.
+                metas: List[Tuple[str, str, str]] = []
+                payloads: List = []
                 for category, items in (listing or {}).items():
                     if not isinstance(items, list):
                         continue
@@ -453,155 +976,155 @@ class ConversationSearcher:
                         if not chat_id:
                             continue
 
-                        if isinstance(chat_id, str) and chat_id.startswith('project__'):
-                            pid = chat_id[len('project__'):]
-                            pr = by_project_uuid.get(pid)
-                            if not pr:
-                                continue
-                            conv = normalize_claude_project(pr.raw, memory=getattr(pr, 'memory', '') or '')
+                        if kind == 'claude':
+                            payload = _claude_payload(special, str(chat_id))
                         else:
-                            if chat_id not in by_uuid:
-                                continue
-                            rec = by_uuid.get(chat_id)
-                            conv = normalize_claude_conversation(rec.raw)
-
-                        # Apply persisted title overrides (stored in listing) so:
-                        # - searching by the renamed title works
-                        # - snippet starts with the new title instead of the old export title
-                        if isinstance(conv, dict) and isinstance(title, str) and title.strip():
-                            conv["title"] = title.strip()
-
-                        blob = extract_search_text_from_normalized(conv)
-                        blob_view = _normalize_space(blob)
-                        blob_norm = blob_view.lower()
-                        new_idx.docs.append(SearchDoc(
-                            chat_id=str(chat_id),
-                            category=str(category),
-                            title=str(title),
-                            file_path=str(special.get('src') or ''),
-                            text_norm=blob_norm,
-                            text_view=blob_view,
-                        ))
-
-                self._rebuild_token_indexes(new_idx)
-                with self._lock:
-                    new_idx.built_at = time.time()
-                    self._indexes[folder] = new_idx
-                return
-
-            if kind == 'gemini':
-                gemini_cache = special.get('gemini_cache')
-                by_id = getattr(gemini_cache, 'by_id', {}) if gemini_cache else {}
-                for category, items in (listing or {}).items():
-                    if not isinstance(items, list):
-                        continue
-                    for it in items:
-                        chat_id = (it or {}).get('id')
-                        title = (it or {}).get('title') or ''
-                        if not chat_id or chat_id not in by_id:
+                            payload = _gemini_record(special, str(chat_id))
+                        if payload is None:
                             continue
-                        rec = by_id.get(chat_id)
-                        conv = normalize_gemini_activity(rec, folder=folder)
-                        blob = extract_search_text_from_normalized(conv)
-                        blob_view = _normalize_space(blob)
-                        blob_norm = blob_view.lower()
-                        new_idx.docs.append(SearchDoc(
-                            chat_id=str(chat_id),
-                            category=str(category),
-                            title=str(title),
-                            file_path=str(special.get('src') or ''),
-                            text_norm=blob_norm,
-                            text_view=blob_view,
-                        ))
-
-                self._rebuild_token_indexes(new_idx)
+                        metas.append((str(chat_id), str(category), title))
+                        payloads.append(payload)
+
+                n = len(payloads)
+                parsed = self._parse_map(
+                    _parse_special, [kind] * n, payloads, [m[2] for m in metas], [folder] * n
+                )
+                for (chat_id, category, title), terms in zip(metas, parsed):
+                    self._add_doc(new_idx, chat_id, category, str(title), src, *terms)
+
+                _finalize_postings(new_idx)
                 with self._lock:
                     new_idx.built_at = time.time()
                     self._indexes[folder] = new_idx
                 return
 
         # 递归遍历目录，支持多级分类
-        for json_file in folder_path.rglob("*.json"):
-            if not json_file.is_file():
-                continue
-
-            relative_dir = json_file.parent.relative_to(folder_path)
-            if str(relative_dir) in (".", ""):
-                category = "全部"
-            else:
-                category = str(relative_dir).replace("\\", "/")
-
-            title_from_name, chat_id = _parse_filename(json_file.stem)
-
-            if not _looks_like_chatgpt_conversation_json(json_file):
-                continue
-
+        # Stat before parsing: a file changing mid-build just looks stale to the next update.
+        file_keys: Dict[str, Tuple[int, int]] = {}
+        for entry in _walk_json(str(folder_path)):
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            except Exception:
-                # 跳过坏文件，保证整体索引不失败
+                st = entry.stat()
+            except OSError:
                 continue
+            file_keys[entry.path] = (st.st_mtime_ns, st.st_size)
+
+        if base is None:
+            # Cold start: resume from the on-disk snapshot of the previous run, if any.
+            self._prune_snapshots_once()
+            base = _load_snapshot(folder, folder_path)
+        updated: Optional[FolderSearchIndex] = None
+        if base is not None and base.kind == '' and base.folder_path == folder_path:
+            updated = self._update_index(base, file_keys)
+        if updated is not None:
+            new_idx = updated
+        else:
+            files = list(file_keys)
+            parsed_docs = self._parse_map(_parse_one, files, [str(folder_path)] * len(files))
+            for path, parsed in zip(files, parsed_docs):
+                doc_index = -1
+                if parsed is not None:
+                    doc_index = len(new_idx.docs)
+                    self._add_doc(new_idx, *parsed)
+                new_idx.file_meta[path] = file_keys[path] + (doc_index,)
+            _finalize_postings(new_idx)
+            new_idx.built_at = time.time()
 
-            # Only index ChatGPT-style conversation objects.
-            if not isinstance(data, dict):
-                continue
+        with self._lock:
+            self._indexes[folder] = new_idx
+            self._build_errors.pop(folder, None)
 
-            body_text = _extract_search_text(data)
-            blob = f"{title_from_name}\n{body_text}"
-            blob_view = _normalize_space(blob)
-            blob_norm = blob_view.lower()
+        if new_idx is not base:
+            self._start_snapshot_save(new_idx)
 
-            doc_index = len(new_idx.docs)
-            new_idx.docs.append(
-                SearchDoc(
-                    chat_id=chat_id,
-                    category=category,
-                    title=title_from_name,
-                    file_path=str(json_file),
-                    text_norm=blob_norm,
-                    text_view=blob_view,
-                )
-            )
+    def _start_snapshot_save(self, idx: FolderSearchIndex) -> None:
+        """Write `idx`'s snapshot on a background (non-daemon) thread, joined at exit."""
+        t = threading.Thread(target=self._save_snapshot_tracked, args=(idx,), name="search-snapshot")
+        with self._lock:
+            self._snapshot_threads.append(t)
+        t.start()
 
-            # token 索引（英文/数字）
-            for tok in set(_ASCII_TOKEN_RE.findall(blob_norm)):
-                s = new_idx.token_index.get(tok)
-                if s is None:
-                    s = set()
-                    new_idx.token_index[tok] = s
-                s.add(doc_index)
-
-                if len(tok) >= _ASCII_PREFIX_MIN_LEN:
-                    max_len = min(_ASCII_PREFIX_MAX_LEN, len(tok))
-                    for plen in range(_ASCII_PREFIX_MIN_LEN, max_len + 1):
-                        p = tok[:plen]
-                        ps = new_idx.token_prefix_index.get(p)
-                        if ps is None:
-                            ps = set()
-                            new_idx.token_prefix_index[p] = ps
-                        ps.add(doc_index)
-
-            # CJK 字符索引（中文）
-            # 用 unique 字符，避免重复添加
-            cjk_chars = {ch for ch in blob_norm if _is_cjk(ch)}
-            for ch in cjk_chars:
-                s = new_idx.cjk_char_index.get(ch)
-                if s is None:
-                    s = set()
-                    new_idx.cjk_char_index[ch] = s
-                s.add(doc_index)
-
-        new_idx.built_at = time.time()
+    def _save_snapshot_tracked(self, idx: FolderSearchIndex) -> None:
+        try:
+            _save_snapshot(idx)
+        finally:
+            with self._lock:
+                self._snapshot_threads.remove(threading.current_thread())
 
+    def _prune_snapshots_once(self) -> None:
         with self._lock:
-            self._indexes[folder] = new_idx
-            self._build_errors.pop(folder, None)
+            if self._snapshots_pruned:
+                return
+            self._snapshots_pruned = True
+        # Keep every folder the scanner can resolve: configured sources and legacy data-root folders.
+        keep = [Path(entry["path"]) for entry in scanner.get_available_folder_entries()]
+        try:
+            with os.scandir(scanner.data_root) as it:
+                keep.extend(Path(entry.path).resolve() for entry in it if entry.is_dir())
+        except OSError:
+            pass
+        _prune_snapshots(keep)
+
+    def _update_index(
+        self, base: FolderSearchIndex, file_keys: Dict[str, Tuple[int, int]]
+    ) -> Optional[FolderSearchIndex]:
+        """Incremental rebuild of a per-file export folder from its previous index.
+
+        Only new or modified files (by mtime/size) are parsed and appended as new docs; docs
+        of modified or removed files are tombstoned in `dead`. `base` is left untouched, so
+        it stays searchable until the swap. Returns None when a full rebuild is due instead
+        (more than a quarter of the docs tombstoned, which also keeps tie order close to a
+        fresh build's), and `base` itself when nothing changed.
+        """
+        meta: Dict[str, Tuple[int, int, int]] = {}
+        changed: List[str] = []
+        for path, key in file_keys.items():
+            prev = base.file_meta.get(path)
+            if prev is not None and prev[:2] == key:
+                meta[path] = prev
+            else:
+                changed.append(path)
+        dead = BitMap(base.dead)
+        for path, prev in base.file_meta.items():
+            if prev[2] >= 0 and meta.get(path) is not prev:
+                dead.add(prev[2])
+        if not changed and len(dead) == len(base.dead):
+            return base
+        if len(dead) * 4 > len(base.docs) + len(changed):
+            return None
+
+        idx = FolderSearchIndex(folder=base.folder, folder_path=base.folder_path)
+        idx.docs = list(base.docs)
+        idx.dead = dead
+        # The spill file is append-only, so base's mapping of its prefix stays valid. New texts
+        # go after anything already in it (see _spill_text), never over it.
+        idx.text_file = base.text_file
+        idx.text_size = base.text_size
+        if idx.text_file is not None:
+            idx.text_file.seek(0, os.SEEK_END)
+
+        parsed_docs = self._parse_map(_parse_one, changed, [str(base.folder_path)] * len(changed))
+        for path, parsed in zip(changed, parsed_docs):
+            doc_index = -1
+            if parsed is not None:
+                doc_index = len(idx.docs)
+                self._add_doc(idx, *parsed)
+            meta[path] = file_keys[path] + (doc_index,)
+        idx.file_meta = meta
+
+        _finalize_postings(idx, base)
+        idx.built_at = time.time()
+        print(f"[search] incremental update {base.folder}: {len(changed)} parsed, {len(dead)} stale docs")
+        return idx
 
     def _search_in_index(self, idx: FolderSearchIndex, q_norm: str, limit: int) -> List[Dict]:
-        # 候选集合：优先用 CJK 字符交集，否则用 token
-        cjk_terms = [ch for ch in q_norm if _is_cjk(ch)]
-        cjk_terms = list(dict.fromkeys(cjk_terms))  # 去重保序
+        # 候选集合：优先用 CJK bigram/字符交集，否则用 token
+        # Each CJK run contributes its overlapping bigrams (far smaller postings than single
+        # chars); a lone CJK char falls back to the per-char index.
+        cjk_terms = list(dict.fromkeys(  # 去重保序
+            bigram
+            for run in _CJK_RUN_RE.findall(q_norm)
+            for bigram in (_CJK_BIGRAM_RE.findall(run) or (run,))
+        ))
 
         token_terms = [t for t in _ASCII_TOKEN_RE.findall(q_norm)]
         token_terms = list(dict.fromkeys(token_terms))
@@ -610,94 +1133,139 @@ class ConversationSearcher:
             primary_tokens = token_terms
         is_long_ascii_query = (len(q_norm) >= 28 and len(primary_tokens) >= 3 and not cjk_terms)
 
-        candidates: Optional[Set[int]] = None
+        candidates: Optional[BitMap] = None
 
         if cjk_terms:
-            # 只取前 N 个字符做交集，避免 query 过长导致交集过小/过慢
-            for ch in cjk_terms[:8]:
-                posting = idx.cjk_char_index.get(ch)
-                if not posting:
-                    candidates = set()
-                    break
-                candidates = posting.copy() if candidates is None else (candidates & posting)
-                if not candidates:
-                    break
+            # 只取前 N 个 term 做交集，避免 query 过长导致交集过小/过慢
+            cjk_postings = [
+                _query_token_posting(idx, term) if len(term) == 2 else idx.cjk_char_index.get(term)
+                for term in cjk_terms[:8]
+            ]
+            if all(cjk_postings):
+                # One C-level n-way intersection, smallest posting first.
+                candidates = BitMap.intersection(*sorted(cjk_postings, key=len))
+            else:
+                candidates = BitMap()
 
         if (candidates is None or not candidates) and primary_tokens:
-            postings: List[Tuple[int, Set[int]]] = []
+            postings: List[Tuple[int, BitMap]] = []
             for tok in primary_tokens:
-                posting = idx.token_index.get(tok)
-                if (not posting) and (len(tok) >= _ASCII_PREFIX_MIN_LEN):
-                    key = tok if len(tok) <= _ASCII_PREFIX_MAX_LEN else tok[:_ASCII_PREFIX_MAX_LEN]
-                    posting = idx.token_prefix_index.get(key)
+                posting = _query_token_posting(idx, tok)
                 if not posting:
-                    candidates = set()
+                    candidates = BitMap()
                     break
                 postings.append((len(posting), posting))
 
             if candidates is None and postings:
                 postings.sort(key=lambda x: x[0])
-                for _, posting in postings:
-                    candidates = posting.copy() if candidates is None else (candidates & posting)
-                    if not candidates:
-                        break
+                candidates = BitMap.intersection(*(posting for _, posting in postings))
 
         if candidates is None:
-            candidates = set(range(len(idx.docs)))
+            candidates = BitMap(range(len(idx.docs)))
+        if idx.dead:
+            candidates = candidates - idx.dead
 
         # 精确 substring 校验 + 简单排序
-        hits: List[Tuple[int, int]] = []  # (score, doc_index)
-        for di in candidates:
+        # Title bonuses bound each candidate's score: 100 (query in title) + 80 (long ASCII query,
+        # all tokens in title) + 50 (earliest position). Title matches (see _title_hits) split
+        # candidates into four bound groups. The (expensive) body substring is then verified
+        # in descending bound order; once the top-`limit` heap beats the best remaining bound,
+        # no later candidate can enter it.
+        if not candidates:
+            return []
+
+        # Body matching works on UTF-8 bytes of text_buf; byte offsets grow with char offsets,
+        # so "earliest match" comparisons are unaffected and chars are only counted when needed.
+        q_bytes = q_norm.encode("utf-8", "surrogatepass")
+        token_bytes = [(t.encode("ascii"), len(t)) for t in primary_tokens[:6]]
+
+        in_title_set = _title_hits(idx, candidates, q_norm)
+        if is_long_ascii_query:
+            all_in_title_set = candidates
+            for t in primary_tokens:
+                all_in_title_set = _title_hits(idx, all_in_title_set, t)
+                if not all_in_title_set:
+                    break
+        else:
+            all_in_title_set = BitMap()
+        rest = candidates - in_title_set - all_in_title_set
+        # Phrase match offsets found ahead of the per-candidate loop (see body_candidates).
+        phrase_hits: Dict[int, int] = {}
+
+        def body_candidates() -> Iterator[int]:
+            # Only reached if the title groups did not fill the heap. When the rest covers most
+            # docs (e.g. no usable index terms), find its phrase matches in one pass over
+            # text_buf and skip the non-matching docs, instead of one find call per doc.
+            if is_long_ascii_query or len(rest) * 2 < len(idx.docs):
+                yield from rest
+                return
+            if len(heap) >= limit and heap[0][0] > 50:
+                return  # The loop would stop at the first body candidate anyway; skip the scan.
+            phrase_hits.update(_text_hits(idx, rest, q_bytes))
+            yield from phrase_hits  # Scan order, i.e. ascending doc index.
+
+        bounded = itertools.chain.from_iterable(
+            ((bound, di, in_title, all_in_title) for di in group)
+            for bound, group, in_title, all_in_title in (
+                (230, in_title_set & all_in_title_set, True, True),
+                (150, in_title_set - all_in_title_set, True, False),
+                (130, all_in_title_set - in_title_set, False, True),
+                (50, body_candidates(), False, False),
+            )
+        )
+
+        # Min-heap of (score, -doc_index, match_byte_pos, match_len): ties keep the lower doc
+        # index, as a stable sort would. (score, -doc_index) is unique, so the match fields that
+        # are carried along for the snippet are never compared.
+        heap: List[Tuple[int, int, int, int]] = []
+        for bound, di, in_title, all_in_title in bounded:
+            if len(heap) >= limit and heap[0][:2] > (bound, -di):
+                break
             doc = idx.docs[di]
             pos_phrase = -1
             if not is_long_ascii_query:
-                pos_phrase = doc.text_norm.find(q_norm)
+                pos_phrase = phrase_hits.get(di)
+                if pos_phrase is None:
+                    pos_phrase = _doc_find(idx, doc, q_bytes)
                 if pos_phrase < 0:
                     continue
 
             score = 0
-            title_norm = _normalize_query(doc.title)
-            if q_norm in title_norm:
+            if in_title:
                 score += 100
 
             pos = pos_phrase
+            q_len = len(q_norm)
             if is_long_ascii_query:
-                if primary_tokens and all(t in title_norm for t in primary_tokens):
+                if all_in_title:
                     score += 80
                 if pos < 0 and primary_tokens:
                     best = -1
-                    for t in primary_tokens[:6]:
-                        p = doc.text_norm.find(t)
+                    best_len = 0
+                    for tb, t_len in token_bytes:
+                        p = _doc_find(idx, doc, tb)
                         if p >= 0 and (best < 0 or p < best):
                             best = p
+                            best_len = t_len
                     pos = best
+                    if best_len:
+                        q_len = best_len
 
             # 越早出现越靠前
-            if pos >= 0:
-                score += max(0, 50 - min(pos, 50))
-            hits.append((score, di))
-
-        hits.sort(key=lambda x: x[0], reverse=True)
+            # A UTF-8 char is at most 4 bytes, so byte offsets >= 200 are >= 50 chars in.
+            if 0 <= pos < 200:
+                score += max(0, 50 - min(_char_offset(idx, doc, pos), 50))
+            if len(heap) < limit:
+                heapq.heappush(heap, (score, -di, pos, q_len))
+            else:
+                heapq.heappushpop(heap, (score, -di, pos, q_len))
 
         out: List[Dict] = []
-        for score, di in hits[:limit]:
-            doc = idx.docs[di]
-            pos = -1
-            q_len = len(q_norm)
-            if not is_long_ascii_query:
-                pos = doc.text_norm.find(q_norm)
-            if pos < 0 and is_long_ascii_query and primary_tokens:
-                best = -1
-                best_len = 0
-                for t in primary_tokens[:6]:
-                    p = doc.text_norm.find(t)
-                    if p >= 0 and (best < 0 or p < best):
-                        best = p
-                        best_len = len(t)
-                pos = best
-                if best_len:
-                    q_len = best_len
-            snippet = _make_snippet(doc.text_view, pos, q_len)
+        for score, neg_di, pos, q_len in sorted(heap, reverse=True):
+            doc = idx.docs[-neg_di]
+            snippet = ""
+            if pos >= 0:
+                snippet = _make_snippet(self._doc_text_view(idx, doc), _char_offset(idx, doc, pos), q_len)
             out.append({
                 'id': doc.chat_id,
                 'category': doc.category,
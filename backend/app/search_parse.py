@@ -0,0 +1,252 @@
+"""搜索索引的解析/分词部分 - 供解析子进程使用
+
+Everything a parse worker runs lives here, so workers import this module (plus the
+normalizers) and never app.search / app.scanner, whose import builds the global scanner.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from app.normalize import (
+    extract_search_text_from_normalized,
+    normalize_claude_conversation,
+    normalize_claude_project,
+    normalize_gemini_activity,
+)
+from app.gemini_batchexecute import is_gemini_batchexecute_export, extract_gemini_batchexecute_text
+from app.external_sources import GeminiConversationRecord
+
+
+_ASCII_TOKEN_RE = re.compile(r"[0-9A-Za-z]{2,}")
+_ASCII_TOKEN_BYTES_RE = re.compile(rb"[0-9a-z]{2,}")
+# Overlapping CJK bigrams (lookahead, so "清华大学" -> 清华/华大/大学).
+_CJK_BIGRAM_RE = re.compile(r"(?=([\u4e00-\u9fff]{2}))")
+# Runs of CJK chars; 常用汉字区（覆盖大多数中文）
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]+")
+_ASCII_LOWER_TABLE = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", b"abcdefghijklmnopqrstuvwxyz")
+
+
+def _normalize_space(s: str) -> str:
+    # str.split() uses the same Unicode whitespace set as re's \s and also drops leading/
+    # trailing runs, so this equals strip() + re.sub(r"\s+", " ") at a fraction of the cost.
+    return " ".join((s or "").split())
+
+
+def _parse_filename(stem: str) -> Tuple[str, str]:
+    parts = stem.rsplit('_', 1)
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    return stem, stem
+
+
+def _load_json_object(path: Path) -> Optional[Dict]:
+    """Parse an export file whose top-level JSON value is an object, or return None.
+
+    The file is memory-mapped and handed to orjson as a buffer, so multi-MB exports are
+    paged in on demand instead of being copied into a bytes object first. orjson also
+    rejects invalid UTF-8 up front. The first 64 KiB are sniffed before parsing, so huge
+    non-conversation blobs (primarily JSON arrays, e.g. batch exports) are rejected without
+    being parsed. We accept any JSON object and let the slow path (schema checks) decide
+    whether it is indexable. Rejecting objects here can easily drop valid exports with
+    alternate schemas (e.g. Gemini per-conversation dumps). Anything orjson refuses but
+    json accepts (lone surrogates, NaN) is retried with json.loads, matching routes.py.
+    """
+    try:
+        with open(path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file: nothing to map.
+                return None
+    except OSError:
+        return None
+    try:
+        # Many batch exports are JSON arrays; our indexer only supports per-conversation objects here.
+        if mm[:64 * 1024].lstrip(b" \t\r\n")[:1] != b"{":
+            return None
+        with memoryview(mm) as view:
+            try:
+                data = orjson.loads(view)
+            except orjson.JSONDecodeError:
+                data = None
+        if data is None:
+            # orjson 比 stdlib 严格（孤立代理项、NaN、>1024 层嵌套会被拒），而 routes.py
+            # 用 json.load 打开同一文件；退回 json 解析，避免对话能打开却搜不到。
+            data = json.loads(mm[:].decode("utf-8"))
+    except Exception:
+        # 跳过坏文件，保证整体索引不失败
+        return None
+    finally:
+        mm.close()
+    return data if isinstance(data, dict) else None
+
+
+def _extract_search_text(json_data: Dict) -> str:
+    """从导出的对话 JSON 中提取可搜索的纯文本。"""
+    out: List[str] = []
+
+    # Gemini per-conversation export (batchexecute wrapper)
+    if is_gemini_batchexecute_export(json_data):
+        return extract_gemini_batchexecute_text(json_data)
+
+    title = json_data.get('title')
+    if isinstance(title, str) and title.strip():
+        out.append(title.strip())
+
+    mapping = json_data.get('mapping', {})
+    if not isinstance(mapping, dict):
+        return "\n".join(out)
+
+    # Hot loop (one pass per mapping node during index builds): bind lookups to locals.
+    # orjson (and the json.loads fallback in _load_json_object) only produce plain
+    # dict/list/str, never subclasses, so exact type checks are safe here.
+    append = out.append
+    _dict = dict
+    _list = list
+    _str = str
+
+    for node in mapping.values():
+        if type(node) is not _dict:
+            continue
+        message = node.get('message')
+        if type(message) is not _dict:
+            continue
+
+        content = message.get('content', {})
+        if type(content) is not _dict:
+            continue
+        get = content.get
+
+        # 最常见：content.parts
+        parts = get('parts')
+        if type(parts) is _list:
+            for p in parts:
+                if type(p) is _str and p:
+                    append(p)
+
+        # 一些类型：content.text / content.content
+        v = get('text')
+        if type(v) is _str and v:
+            append(v)
+        v = get('content')
+        if type(v) is _str and v:
+            append(v)
+
+        # thoughts: [{content, summary, ...}, ...]
+        if get('content_type') == 'thoughts':
+            thoughts = get('thoughts')
+            if type(thoughts) is _list:
+                for t in thoughts:
+                    if type(t) is not _dict:
+                        continue
+                    v = t.get('content')
+                    if type(v) is _str and v:
+                        append(v)
+                    v = t.get('summary')
+                    if type(v) is _str and v:
+                        append(v)
+
+    return "\n".join(out)
+
+
+def _export_doc_text(json_file: Path, title_from_name: str) -> Optional[str]:
+    """Searchable text of one ChatGPT-style export file, or None if it is not indexable."""
+    # Only index ChatGPT-style conversation objects.
+    data = _load_json_object(json_file)
+    if data is None:
+        return None
+
+    body_text = _extract_search_text(data)
+    return f"{title_from_name}\n{body_text}"
+
+
+# Claude payload shipped to parse workers: (raw export dict, project memory or None for chats).
+_ClaudePayload = Tuple[Dict, Optional[str]]
+
+
+def _claude_record_text(payload: _ClaudePayload, title: str) -> str:
+    raw, project_memory = payload
+    if project_memory is not None:
+        conv = normalize_claude_project(raw, memory=project_memory)
+    else:
+        conv = normalize_claude_conversation(raw)
+
+    # Apply persisted title overrides (stored in listing) so:
+    # - searching by the renamed title works
+    # - snippet starts with the new title instead of the old export title
+    if isinstance(conv, dict) and isinstance(title, str) and title.strip():
+        conv["title"] = title.strip()
+
+    return extract_search_text_from_normalized(conv)
+
+
+def _gemini_record_text(rec: GeminiConversationRecord, folder: str) -> str:
+    return extract_search_text_from_normalized(normalize_gemini_activity(rec, folder=folder))
+
+
+def _index_terms(blob: str) -> Tuple[bytes, int, List[str], List[str]]:
+    """`(UTF-8 lowercased text, its length in chars, unique terms, unique CJK chars)`.
+
+    Terms are ASCII tokens plus CJK bigrams; both share the serialized token postings.
+    """
+    view = _normalize_space(blob)
+    # Dedupe with a C-level set() first, so per-char Python checks run once per distinct
+    # char instead of once per char of a potentially multi-MB blob.
+    chars = set(view)
+    # (Same range as _CJK_RUN_RE; an inline compare beats the regex on a set of chars.)
+    cjk_chars = [ch for ch in chars if "\u4e00" <= ch <= "\u9fff"]
+    # CJK chars are caseless, so bigrams of `view` equal those of the lowercased text.
+    bigrams = list(set(_CJK_BIGRAM_RE.findall(view))) if cjk_chars else []
+
+    if not view.isascii() and all(ch.isascii() or ch.lower() == ch for ch in chars):
+        # Non-ASCII text without cased letters (CJK, symbols, emoji): lowercasing only touches
+        # ASCII, and translating the UTF-8 bytes is ~3x faster than str.lower() on such text.
+        data = view.encode("utf-8", "surrogatepass").translate(_ASCII_LOWER_TABLE)
+        tokens = [t.decode("ascii") for t in set(_ASCII_TOKEN_BYTES_RE.findall(data))]
+        return data, len(view), tokens + bigrams, cjk_chars
+
+    # Pure ASCII (str.lower() has its own fast path there) or text with non-ASCII cased letters.
+    blob_norm = view.lower()
+    tokens = list(set(_ASCII_TOKEN_RE.findall(blob_norm)))
+    return blob_norm.encode("utf-8", "surrogatepass"), len(blob_norm), tokens + bigrams, cjk_chars
+
+
+# (chat_id, category, title, file_path) + _index_terms(...)
+_ParsedDoc = Tuple[str, str, str, str, bytes, int, List[str], List[str]]
+
+
+def _parse_one(json_file_str: str, folder_root_str: str) -> Optional[_ParsedDoc]:
+    """Parse and tokenize one ChatGPT-style export (see `_ParsedDoc`).
+
+    Module-level so it can run in a worker process; returns None for files that are skipped.
+    Tokenizing here keeps the regex work inside the parallel part of the build.
+    """
+    relative_dir = os.path.relpath(os.path.dirname(json_file_str), folder_root_str)
+    if relative_dir in (".", ""):
+        category = "全部"
+    else:
+        category = relative_dir.replace("\\", "/")
+
+    title_from_name, chat_id = _parse_filename(os.path.splitext(os.path.basename(json_file_str))[0])
+
+    blob = _export_doc_text(Path(json_file_str), title_from_name)
+    if blob is None:
+        return None
+    return (chat_id, category, title_from_name, json_file_str) + _index_terms(blob)
+
+
+def _parse_special(kind: str, payload, title: str, folder: str) -> Tuple[bytes, int, List[str], List[str]]:
+    """Normalize and tokenize one Claude/Gemini record; module-level for worker processes."""
+    if kind == 'claude':
+        blob = _claude_record_text(payload, title)
+    else:
+        blob = _gemini_record_text(payload, folder)
+    return _index_terms(blob)
@@ -13,6 +13,10 @@ Usage (PowerShell)
 - python backend/audit_citations.py --root data/chatgpt_team_chat_1231
 - python backend/audit_citations.py --root data --glob "**/*.json" --top 30 --out backend/audit_report.json
 
+Optional dependencies (both in backend/requirements.txt; used when installed)
+- orjson: faster JSON parsing and report writing (falls back to json).
+- ijson: exports over 10 MB are streamed node by node instead of loaded whole.
+
 Exit code
 - 0: no missing/empty-url citations encountered
 - 2: at least one missing/empty-url citation encountered
@@ -21,26 +25,47 @@ Exit code
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
 import os
 import re
 import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, asdict
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the stdlib parser/writer.
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Optional: without it huge exports are loaded whole.
+    ijson = None
 
 
 P_START = "\ue200"  # Private-use char used by ChatGPT exports
 P_MID = "\ue202"
 P_END = "\ue201"
 
-# Other observed variants
-BRACKET_CITE_RE = re.compile(r"⸢cite⸣.*?⸣")
-CITETURN_RE = re.compile(r"citeturn\d+[a-z]+\d+", re.IGNORECASE)
+# Private-use form plus the other observed variants (⸢cite⸣…⸣, citeturnNxxxN),
+# matched in a single pass. Scoped flags keep each alternative's semantics:
+# DOTALL only for the private-use form, IGNORECASE only for citeturn.
+_ALL_CITE_RE = re.compile(
+    f"(?s:{P_START}cite{P_MID}.*?{P_END})"
+    r"|⸢cite⸣.*?⸣"
+    r"|(?i:citeturn\d+[a-z]+\d+)"
+)
 TURN_TOKEN_RE = re.compile(r"turn\d+[a-z]+\d+", re.IGNORECASE)
+# Case-insensitive "citeturn" probe; avoids copying the whole text with lower().
+_CITETURN_CI = re.compile("citeturn", re.I).search
 
 
-@dataclass
+@dataclass(slots=True)
 class FileStats:
     path: str
     nodes_with_messages: int = 0
@@ -56,7 +81,7 @@ class FileStats:
     read_error: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Sample:
     path: str
     node_id: str
@@ -65,9 +90,23 @@ class Sample:
     extracted_turn_tokens: List[str]
 
 
-def _safe_join_parts(parts: Any) -> str:
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects lone surrogate escapes, NaN and >1024-deep nesting that json
+            # accepts; retry so such files are still audited.
+            pass
+    return json.loads(data.decode("utf-8"))
+
+
+def _safe_join_parts(parts: Any, structured: bool = False) -> str:
     if not isinstance(parts, list):
         return ""
+    if not structured:
+        # Cite markers live in the string parts; skip serializing dict/other parts.
+        return "\n".join(p for p in parts if isinstance(p, str))
     out: List[str] = []
     for p in parts:
         if isinstance(p, str):
@@ -83,43 +122,15 @@ def _safe_join_parts(parts: Any) -> str:
     return "\n".join(out)
 
 
-def _extract_private_use_cites(text: str) -> List[str]:
-    """Extract full matched_text markers like \ue200cite\ue202...\ue201.
-
-    We avoid complex regex here to be resilient against odd payload contents.
-    """
-    if not text or P_START not in text:
-        return []
-    markers: List[str] = []
-    i = 0
-    needle = f"{P_START}cite{P_MID}"
-    while True:
-        start = text.find(needle, i)
-        if start < 0:
-            break
-        end = text.find(P_END, start + len(needle))
-        if end < 0:
-            # Unterminated; stop scanning further to avoid infinite loop
-            break
-        markers.append(text[start : end + 1])
-        i = end + 1
-    return markers
-
-
-def _extract_other_cites(text: str) -> List[str]:
-    markers: List[str] = []
-    if not text:
-        return markers
-    markers.extend(m.group(0) for m in BRACKET_CITE_RE.finditer(text))
-    markers.extend(m.group(0) for m in CITETURN_RE.finditer(text))
-    return markers
-
-
 def extract_cite_markers(text: str) -> List[str]:
-    markers = []
-    markers.extend(_extract_private_use_cites(text))
-    markers.extend(_extract_other_cites(text))
-    return markers
+    """All cite markers in ``text``, in document order, from a single regex pass."""
+    if not text:
+        return []
+    # Most messages carry no markers: cheap substring / literal probes first,
+    # the full alternation scan only when one of them hits.
+    if P_START not in text and "⸢" not in text and _CITETURN_CI(text) is None:
+        return []
+    return [m.group(0) for m in _ALL_CITE_RE.finditer(text)]
 
 
 def _iter_nodes(mapping: Any) -> Iterable[Tuple[str, Dict[str, Any]]]:
@@ -131,13 +142,18 @@ def _iter_nodes(mapping: Any) -> Iterable[Tuple[str, Dict[str, Any]]]:
 
 
 def _extract_urls_from_ref(ref: Any) -> List[str]:
+    """URLs of one content reference, deduped in order."""
     urls: List[str] = []
     if not isinstance(ref, dict):
         return urls
+    seen: Set[str] = set()
 
     def push(val: Any) -> None:
-        if isinstance(val, str) and val.strip():
-            urls.append(val.strip())
+        if isinstance(val, str):
+            u = val.strip()
+            if u and u not in seen:
+                seen.add(u)
+                urls.append(u)
         elif isinstance(val, list):
             for it in val:
                 push(it)
@@ -159,23 +175,18 @@ def _extract_urls_from_ref(ref: Any) -> List[str]:
                 push(it.get("source_url"))
                 push(it.get("href"))
 
-    # Dedup while preserving order
-    seen = set()
-    out: List[str] = []
-    for u in urls:
-        if u not in seen:
-            seen.add(u)
-            out.append(u)
-    return out
+    return urls
+
+
+# Shared result for messages without content_references (callers only .get() it).
+_EMPTY_REFS: Dict[str, List[Dict[str, Any]]] = {}
 
 
 def _index_content_references(message: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
     md = message.get("metadata")
-    if not isinstance(md, dict):
-        return {}
-    refs = md.get("content_references")
-    if not isinstance(refs, list):
-        return {}
+    refs = md.get("content_references") if isinstance(md, dict) else None
+    if not isinstance(refs, list) or not refs:
+        return _EMPTY_REFS
 
     idx: Dict[str, List[Dict[str, Any]]] = {}
     for r in refs:
@@ -187,12 +198,49 @@ def _index_content_references(message: Dict[str, Any]) -> Dict[str, List[Dict[st
     return idx
 
 
-def audit_file(path: Path, sample_limit_per_file: int = 3) -> Tuple[FileStats, List[Sample]]:
+# Exports above this size are streamed node by node (needs ijson) instead of
+# being parsed into one tree, so a worker's memory stays O(node), not O(file).
+_STREAM_THRESHOLD = 10_000_000
+
+
+def _should_stream(path: Path) -> bool:
+    if ijson is None:
+        return False
+    try:
+        return path.stat().st_size > _STREAM_THRESHOLD
+    except OSError:
+        return False  # the regular load reports the error
+
+
+def _stream_nodes(path: Path, errors: List[str]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    """Yield the export's mapping nodes; a read/parse failure ends the stream and is
+    appended to `errors` instead of raised, so it can't be confused with an audit bug."""
+    try:
+        with path.open("rb") as f:
+            for node_id, node in ijson.kvitems(f, "mapping", use_float=True):
+                if isinstance(node_id, str) and isinstance(node, dict):
+                    yield node_id, node
+    except (ijson.JSONError, OSError, UnicodeDecodeError) as e:
+        errors.append(f"{type(e).__name__}: {e}")
+
+
+def audit_file(
+    path: Path, sample_limit_per_file: int = 3, structured_parts: bool = False, raw: Optional[bytes] = None
+) -> Tuple[FileStats, List[Sample]]:
+    """Audit one export; `raw` is the file's bytes when the caller already read them."""
     stats = FileStats(path=str(path))
     samples: List[Sample] = []
 
+    if raw is None and _should_stream(path):
+        read_errors: List[str] = []
+        stats, samples = _audit_nodes(path, _stream_nodes(path, read_errors), sample_limit_per_file, structured_parts)
+        if read_errors:
+            # Streamed export turned out malformed: report it like a failed load.
+            return FileStats(path=str(path), read_error=read_errors[0]), []
+        return stats, samples
+
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = _loads(path.read_bytes() if raw is None else raw)
     except Exception as e:
         stats.read_error = f"{type(e).__name__}: {e}"
         return stats, samples
@@ -202,83 +250,212 @@ def audit_file(path: Path, sample_limit_per_file: int = 3) -> Tuple[FileStats, L
         # Not a conversation export; ignore gracefully
         return stats, samples
 
-    for node_id, node in _iter_nodes(mapping):
-        msg = node.get("message") if isinstance(node, dict) else None
-        if not isinstance(msg, dict):
-            continue
+    return _audit_nodes(path, _iter_nodes(mapping), sample_limit_per_file, structured_parts)
+
 
-        stats.nodes_with_messages += 1
+def _audit_nodes(
+    path: Path,
+    nodes: Iterable[Tuple[str, Dict[str, Any]]],
+    sample_limit_per_file: int,
+    structured_parts: bool,
+) -> Tuple[FileStats, List[Sample]]:
+    stats = FileStats(path=str(path))
+    samples: List[Sample] = []
+    # Per-kind sample counts, so the limit check doesn't rescan `samples` per mark
+    sample_counts: Dict[str, int] = {"missing_ref": 0, "no_urls": 0}
+    for node_id, node in nodes:
+        _audit_node(stats, samples, sample_counts, path, node_id, node, sample_limit_per_file, structured_parts)
+    return stats, samples
 
-        content = msg.get("content")
-        parts_text = ""
-        if isinstance(content, dict):
-            parts_text = _safe_join_parts(content.get("parts"))
 
-        if parts_text:
-            stats.nodes_with_text += 1
+def _audit_node(
+    stats: FileStats,
+    samples: List[Sample],
+    sample_counts: Dict[str, int],
+    path: Path,
+    node_id: str,
+    node: Dict[str, Any],
+    sample_limit_per_file: int,
+    structured_parts: bool,
+) -> None:
+    msg = node.get("message")
+    if not isinstance(msg, dict):
+        return
 
-        cite_marks = extract_cite_markers(parts_text)
-        if not cite_marks:
-            continue
+    stats.nodes_with_messages += 1
+
+    content = msg.get("content")
+    parts_text = ""
+    if isinstance(content, dict):
+        parts_text = _safe_join_parts(content.get("parts"), structured_parts)
+
+    if parts_text:
+        stats.nodes_with_text += 1
+
+    cite_marks = extract_cite_markers(parts_text)
+    if not cite_marks:
+        return
 
-        stats.nodes_with_cite += 1
-        stats.cite_marks_total += len(cite_marks)
-
-        ref_index = _index_content_references(msg)
-
-        for mt in cite_marks:
-            refs_for_mt = ref_index.get(mt)
-            if not refs_for_mt:
-                stats.cite_marks_missing_ref += 1
-                if len([s for s in samples if s.kind == "missing_ref"]) < sample_limit_per_file:
-                    samples.append(
-                        Sample(
-                            path=str(path),
-                            node_id=node_id,
-                            kind="missing_ref",
-                            matched_text=mt,
-                            extracted_turn_tokens=TURN_TOKEN_RE.findall(mt),
-                        )
+    stats.nodes_with_cite += 1
+    stats.cite_marks_total += len(cite_marks)
+
+    ref_index = _index_content_references(msg)
+    # Refs come from this message's metadata and are often shared across its
+    # markers; keyed by id() while `msg` keeps them alive.
+    url_cache: Dict[int, List[str]] = {}
+
+    for mt in cite_marks:
+        refs_for_mt = ref_index.get(mt)
+        if not refs_for_mt:
+            stats.cite_marks_missing_ref += 1
+            if sample_counts["missing_ref"] < sample_limit_per_file:
+                sample_counts["missing_ref"] += 1
+                samples.append(
+                    Sample(
+                        path=str(path),
+                        node_id=node_id,
+                        kind="missing_ref",
+                        matched_text=mt,
+                        extracted_turn_tokens=TURN_TOKEN_RE.findall(mt),
                     )
-                continue
+                )
+            continue
 
-            stats.cite_marks_with_ref += 1
-            urls: List[str] = []
-            for r in refs_for_mt:
-                urls.extend(_extract_urls_from_ref(r))
-
-            # Dedup
-            dedup = []
-            seen = set()
-            for u in urls:
-                if u not in seen:
-                    seen.add(u)
-                    dedup.append(u)
-            urls = dedup
-
-            if urls:
-                stats.cite_marks_with_urls += 1
-            else:
-                stats.cite_marks_ref_no_urls += 1
-                if len([s for s in samples if s.kind == "no_urls"]) < sample_limit_per_file:
-                    samples.append(
-                        Sample(
-                            path=str(path),
-                            node_id=node_id,
-                            kind="no_urls",
-                            matched_text=mt,
-                            extracted_turn_tokens=TURN_TOKEN_RE.findall(mt),
-                        )
+        stats.cite_marks_with_ref += 1
+        # One dedup set shared across all refs of this marker
+        seen_urls: Set[str] = set()
+        urls: List[str] = []
+        for r in refs_for_mt:
+            ref_urls = url_cache.get(id(r))
+            if ref_urls is None:
+                ref_urls = url_cache[id(r)] = _extract_urls_from_ref(r)
+            for u in ref_urls:
+                if u not in seen_urls:
+                    seen_urls.add(u)
+                    urls.append(u)
+
+        if urls:
+            stats.cite_marks_with_urls += 1
+        else:
+            stats.cite_marks_ref_no_urls += 1
+            if sample_counts["no_urls"] < sample_limit_per_file:
+                sample_counts["no_urls"] += 1
+                samples.append(
+                    Sample(
+                        path=str(path),
+                        node_id=node_id,
+                        kind="no_urls",
+                        matched_text=mt,
+                        extracted_turn_tokens=TURN_TOKEN_RE.findall(mt),
                     )
+                )
 
-    return stats, samples
+
+def _audit_one(job: Tuple[str, int, bool]) -> Tuple[FileStats, List[Sample]]:
+    """Worker entry point: module-level so ProcessPoolExecutor can pickle it."""
+    path_str, sample_limit_per_file, structured_parts = job
+    return audit_file(Path(path_str), sample_limit_per_file=sample_limit_per_file, structured_parts=structured_parts)
+
+
+def _audit_files(
+    files: List[Path], sample_limit_per_file: int, workers: int, structured_parts: bool = False
+) -> Iterable[Tuple[FileStats, List[Sample]]]:
+    """Yield audit_file results in `files` order; files are independent, so fan out to processes."""
+    jobs = [(str(p), sample_limit_per_file, structured_parts) for p in files]
+    if workers <= 1 or len(jobs) < 2:
+        yield from _audit_serial(files, sample_limit_per_file, structured_parts)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # A few chunks per worker keeps them balanced while amortizing IPC per file.
+        chunksize = max(1, len(jobs) // (workers * 4))
+        yield from executor.map(_audit_one, jobs, chunksize=chunksize)
+
+
+_READ_AHEAD = 32
+
+
+def _prefetch(path: Path) -> Optional[bytes]:
+    # Files that will be streamed are not read up front (that would undo streaming).
+    return None if _should_stream(path) else path.read_bytes()
+
+
+def _audit_serial(
+    files: List[Path], sample_limit_per_file: int, structured_parts: bool
+) -> Iterable[Tuple[FileStats, List[Sample]]]:
+    """In-process audit with file reads prefetched on threads (overlaps I/O with parsing).
+
+    The window is bounded so at most _READ_AHEAD files are held in memory. Worker
+    processes don't need this: each one reads its own files, so reads already overlap.
+    """
+    if len(files) < 2:
+        for p in files:
+            yield audit_file(p, sample_limit_per_file=sample_limit_per_file, structured_parts=structured_parts)
+        return
+    with ThreadPoolExecutor(max_workers=min(_READ_AHEAD, len(files))) as pool:
+        it = iter(files)
+        window: "deque[Tuple[Path, Future]]" = deque((p, pool.submit(_prefetch, p)) for p in islice(it, _READ_AHEAD))
+        while window:
+            p, fut = window.popleft()
+            nxt = next(it, None)
+            if nxt is not None:
+                window.append((nxt, pool.submit(_prefetch, nxt)))
+            try:
+                raw: Optional[bytes] = fut.result()
+            except Exception:
+                raw = None  # let audit_file re-read and record the read_error
+            yield audit_file(p, sample_limit_per_file=sample_limit_per_file, structured_parts=structured_parts, raw=raw)
+
+
+def _add_stats(total: FileStats, st: FileStats) -> None:
+    total.nodes_with_messages += st.nodes_with_messages
+    total.nodes_with_text += st.nodes_with_text
+    total.nodes_with_cite += st.nodes_with_cite
+    total.cite_marks_total += st.cite_marks_total
+    total.cite_marks_with_ref += st.cite_marks_with_ref
+    total.cite_marks_with_urls += st.cite_marks_with_urls
+    total.cite_marks_missing_ref += st.cite_marks_missing_ref
+    total.cite_marks_ref_no_urls += st.cite_marks_ref_no_urls
+
+
+def _walk_json(root: Path, limit: int = 0) -> List[Path]:
+    """*.json files under root via os.scandir, ordered like sorted(root.glob("**/*.json")).
+
+    Depth-first with each directory's entries in name order matches Path's
+    part-wise sort order, so a positive ``limit`` can stop the walk early.
+    """
+    out: List[Path] = []
+    stack: List[Tuple[bool, str]] = [(True, str(root))]
+    while stack:
+        is_dir, path = stack.pop()
+        if not is_dir:
+            out.append(Path(path))
+            if limit and len(out) >= limit:
+                break
+            continue
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: os.path.normcase(e.name), reverse=True)
+        except OSError:
+            continue
+        for e in entries:
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append((True, e.path))
+                elif os.path.normcase(e.name).endswith(".json"):
+                    stack.append((False, e.path))
+            except OSError:
+                continue
+    return out
 
 
-def _gather_files(root: Path, glob_pat: str) -> List[Path]:
+def _gather_files(root: Path, glob_pat: str, limit: int = 0) -> List[Path]:
     # Path.rglob doesn't accept "**/*.json" reliably when root is file; normalize
     if root.is_file():
         return [root]
-    return sorted(root.glob(glob_pat))
+    if glob_pat == "**/*.json":
+        return _walk_json(root, limit)
+    files = sorted(root.glob(glob_pat))
+    return files[:limit] if limit else files
 
 
 def main(argv: Sequence[str]) -> int:
@@ -289,36 +466,41 @@ def main(argv: Sequence[str]) -> int:
     ap.add_argument("--samples", type=int, default=3, help="Samples per file (for missing/no_urls)")
     ap.add_argument("--out", default="", help="Write full report JSON to this path")
     ap.add_argument("--max-files", type=int, default=0, help="Limit number of files (0=all)")
+    ap.add_argument("--workers", type=int, default=0, help="Worker processes (0=CPU count, 1=serial)")
+    ap.add_argument(
+        "--structured-parts",
+        action="store_true",
+        help="Also stringify non-string message parts (dict blocks) when scanning for markers",
+    )
     args = ap.parse_args(argv)
 
     root = Path(args.root)
-    files = _gather_files(root, args.glob)
-    if args.max_files and args.max_files > 0:
-        files = files[: args.max_files]
+    files = _gather_files(root, args.glob, max(args.max_files, 0))
 
+    # Per-file stats are only kept for the --out report; otherwise just offenders.
     all_stats: List[FileStats] = []
     all_samples: List[Sample] = []
+    offenders: List[FileStats] = []
+    total = FileStats(path="<TOTAL>")
 
-    for i, p in enumerate(files, 1):
-        st, sm = audit_file(p, sample_limit_per_file=args.samples)
-        all_stats.append(st)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    for i, (st, sm) in enumerate(_audit_files(files, args.samples, workers, args.structured_parts), 1):
+        _add_stats(total, st)
+        if args.out:
+            all_stats.append(st)
+        if st.cite_marks_missing_ref or st.cite_marks_ref_no_urls or st.read_error:
+            offenders.append(st)
         all_samples.extend(sm)
         if i % 200 == 0:
             print(f"...scanned {i}/{len(files)} files")
 
-    # Aggregate
-    total = FileStats(path="<TOTAL>")
-    total.nodes_with_messages = sum(s.nodes_with_messages for s in all_stats)
-    total.nodes_with_text = sum(s.nodes_with_text for s in all_stats)
-    total.nodes_with_cite = sum(s.nodes_with_cite for s in all_stats)
-    total.cite_marks_total = sum(s.cite_marks_total for s in all_stats)
-    total.cite_marks_with_ref = sum(s.cite_marks_with_ref for s in all_stats)
-    total.cite_marks_with_urls = sum(s.cite_marks_with_urls for s in all_stats)
-    total.cite_marks_missing_ref = sum(s.cite_marks_missing_ref for s in all_stats)
-    total.cite_marks_ref_no_urls = sum(s.cite_marks_ref_no_urls for s in all_stats)
-
-    offenders = [s for s in all_stats if (s.cite_marks_missing_ref or s.cite_marks_ref_no_urls or s.read_error)]
-    offenders.sort(key=lambda s: (s.read_error is None, -(s.cite_marks_missing_ref + s.cite_marks_ref_no_urls), -s.cite_marks_total))
+    # Only the top N are printed: a bounded heap instead of sorting every offender.
+    # (nsmallest is stable, same result as sorted(...)[:N].)
+    top_offenders = heapq.nsmallest(
+        max(args.top, 0),
+        offenders,
+        key=lambda s: (s.read_error is None, -(s.cite_marks_missing_ref + s.cite_marks_ref_no_urls), -s.cite_marks_total),
+    )
 
     print("\n=== Citation audit summary ===")
     print(f"Scanned files: {len(files)}")
@@ -337,7 +519,7 @@ def main(argv: Sequence[str]) -> int:
 
     if offenders:
         print("\n=== Top offenders ===")
-        for s in offenders[: args.top]:
+        for s in top_offenders:
             if s.read_error:
                 print(f"READ_ERROR  {s.path}  {s.read_error}")
             else:
@@ -355,7 +537,10 @@ def main(argv: Sequence[str]) -> int:
             "samples": [asdict(s) for s in all_samples],
         }
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        if orjson is not None:
+            out_path.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        else:
+            out_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
         print(f"\nWrote report: {out_path}")
 
     has_fail = (total.cite_marks_missing_ref + total.cite_marks_ref_no_urls) > 0
@@ -12,6 +12,9 @@ DATA_ROOT = BASE_DIR / "data"
 # 数据源配置文件（用户可在设置中修改）
 DATA_SOURCE_CONFIG_PATH = BASE_DIR / "data_sources.json"
 
+# 搜索索引快照目录（重启后只需重新解析变更的文件）
+SEARCH_CACHE_DIR = BASE_DIR / ".search_cache"
+
 # Flask 配置
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
@@ -25,3 +28,4 @@ class Config:
     DATA_SOURCE_CONFIG_FILE = DATA_SOURCE_CONFIG_PATH
     BASE_DIR_PATH = BASE_DIR
     BACKEND_DIR_PATH = BACKEND_DIR
+    SEARCH_CACHE_DIR_PATH = SEARCH_CACHE_DIR
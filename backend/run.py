@@ -5,8 +5,6 @@ import sys
 from app import create_app
 from config import Config
 
-app = create_app()
-
 
 def _get_host_port() -> tuple[str, int]:
     # Windows 上部分环境/安全策略可能禁止绑定到 0.0.0.0，默认仅监听本机更稳妥。
@@ -20,6 +18,9 @@ def _get_host_port() -> tuple[str, int]:
 
 
 if __name__ == '__main__':
+    # Built here rather than at import time: search parse workers are spawned, and spawn
+    # re-imports this script in every worker (as __mp_main__).
+    app = create_app()
     host, port = _get_host_port()
 
     print("Starting UniteChat backend...")
@@ -22,6 +22,11 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the stdlib parser.
+    orjson = None
+
 
 # Allow `from app...` imports
 sys.path.insert(0, "backend")
@@ -53,7 +58,14 @@ def _iter_export_files() -> Iterable[Path]:
 
 def _load_json(path: Path) -> Optional[Dict[str, Any]]:
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        raw = path.read_bytes()
+        if orjson is not None:
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                # orjson is stricter than json (lone surrogates, NaN); retry before skipping.
+                pass
+        return json.loads(raw.decode("utf-8"))
     except Exception:
         return None
 
@@ -62,13 +74,7 @@ def _thinking_total_chars(msg: Dict[str, Any]) -> int:
     thinking = msg.get("thinking")
     if not isinstance(thinking, list):
         return 0
-    total = 0
-    for step in thinking:
-        if isinstance(step, dict):
-            c = step.get("content")
-            if isinstance(c, str):
-                total += len(c)
-    return total
+    return sum(len(s["content"]) for s in thinking if isinstance(s, dict) and isinstance(s.get("content"), str))
 
 
 def _check_conversation(conv: Dict[str, Any]) -> Optional[str]:
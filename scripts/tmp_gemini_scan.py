@@ -1,3 +1,4 @@
+import mmap
 import re
 from pathlib import Path
 
@@ -10,20 +11,32 @@ needles = [
 ]
 counts = {n: 0 for n in needles}
 urls: list[str] = []
-rx = re.compile(br'https?://gemini\.google\.com/[^"\s<]+', re.IGNORECASE)
+# Every needle (and every URL) starts with the host prefix, so one pass over the
+# mapped file finds them all; each hit is classified by the bytes around it.
+# (Needles overlap, e.g. an href to /share counts twice, so a plain alternation
+# regex would undercount.)
+host_rx = re.compile(br'https?://gemini\.google\.com', re.IGNORECASE)
+tail_rx = re.compile(br'/[^"\s<]+')
 
-with p.open('rb') as f:
-    for line in f:
-        low = line.lower()
-        for n in needles:
-            counts[n] += low.count(n)
-        if len(urls) < 30:
-            for m in rx.finditer(line):
-                u = m.group(0).decode('utf-8', 'ignore')
+url_end = 0  # URLs don't nest: skip hits inside the previous URL, like finditer did
+with p.open('rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+    for m in host_rx.finditer(mm):
+        start, end = m.start(), m.end()
+        if end - start == len(b'https://gemini.google.com'):
+            if mm[max(0, start - 6):start].lower() == b'href="':
+                counts[needles[0]] += 1
+            nxt = mm[end:end + 6].lower()
+            if nxt == b'/share':
+                counts[needles[1]] += 1
+            if nxt[:4] == b'/app':
+                counts[needles[2]] += 1
+        if len(urls) < 30 and start >= url_end:
+            t = tail_rx.match(mm, end)
+            if t:
+                url_end = t.end()
+                u = mm[start:t.end()].decode('utf-8', 'ignore')
                 if u not in urls:
                     urls.append(u)
-                    if len(urls) >= 30:
-                        break
 
 print('file', p)
 print('counts')
@@ -9,11 +9,20 @@ Usage:
 
 from __future__ import annotations
 
+import functools
 import json
+import mmap
+import re
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the stdlib parser.
+    orjson = None
 
 
 # Allow `from app...` imports
@@ -23,139 +32,197 @@ from app.gemini_batchexecute import parse_gemini_batchexecute_conversation
 
 
 ROOT = Path(__file__).resolve().parents[1]
+_FIX_DIR = ROOT / "data" / "gemini_export_2026-02-02_Piqa"
+_FIX_DIR2 = ROOT / "data" / "gemini_export_2026-02-02"
+
+_CONFIRMATION_RE = re.compile(r"googleusercontent\.com/deep_research_confirmation_content", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class CheckResult:
+    """Outcome of one check; summary fields are only formatted when printed."""
+
+    ok: bool
+    msg: str = ""
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+    def describe(self) -> str:
+        return self.msg or " ".join(f"{k}={v}" for k, v in self.fields.items())
 
 
-@dataclass
-class AssistantStats:
-    idx: int
-    content_len: int
-    has_thinking: bool
+class AssistantSummary(NamedTuple):
+    count: int
+    max_idx: int  # message index of the longest assistant content (-1 if none)
+    max_len: int
+    max_content: str  # the longest assistant content itself ("" if none)
+    empty_with_thinking: List[int]  # message indexes: thinking present, content empty
 
 
-def _assistant_stats(messages: List[Dict[str, Any]]) -> List[AssistantStats]:
-    out: List[AssistantStats] = []
+def _assistant_summary(messages: List[Dict[str, Any]]) -> AssistantSummary:
+    """Everything the checks need about assistant messages, in one pass."""
+    count = 0
+    max_idx, max_len, max_content = -1, -1, ""
+    empty_with_thinking: List[int] = []
     for i, m in enumerate(messages):
         if m.get("role") != "assistant":
             continue
-        content = m.get("content") or ""
-        thinking = m.get("thinking")
-        out.append(
-            AssistantStats(
-                idx=i,
-                content_len=len(content) if isinstance(content, str) else 0,
-                has_thinking=bool(thinking),
-            )
-        )
-    return out
+        count += 1
+        content = m.get("content")
+        if not isinstance(content, str):
+            content = ""
+        content_len = len(content)
+        if content_len > max_len:
+            max_idx, max_len, max_content = i, content_len, content
+        if content_len == 0 and m.get("thinking"):
+            empty_with_thinking.append(i)
+    return AssistantSummary(count, max_idx, max_len, max_content, empty_with_thinking)
 
 
 def _load_json(path: Path) -> Dict[str, Any]:
-    return json.loads(path.read_text(encoding="utf-8"))
+    # Parse straight from the mapped file: no bytes copy of the (multi-MB) fixture.
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if orjson is not None:
+            with memoryview(mm) as view:
+                try:
+                    return orjson.loads(view)
+                except orjson.JSONDecodeError:
+                    # orjson rejects lone surrogates and NaN, which the app's loaders still
+                    # accept (see search_parse._load_json_object); retry with json.
+                    pass
+        return json.loads(mm[:])
 
 
-def _check_normal_chat(path: Path) -> Tuple[bool, str]:
-    data = _load_json(path)
-    conv = parse_gemini_batchexecute_conversation(data)
+@functools.lru_cache(maxsize=None)
+def _parse_conv_cached(resolved: str) -> Dict[str, Any]:
+    return parse_gemini_batchexecute_conversation(_load_json(Path(resolved)))
+
+
+def _parse_conv(path: Path) -> Dict[str, Any]:
+    """Parsed conversation for a fixture; each file is parsed once per run even if several checks use it."""
+    return _parse_conv_cached(str(path.resolve()))
+
+
+def _check_normal_chat(path: Path) -> CheckResult:
+    conv = _parse_conv(path)
     messages = conv.get("messages") or []
-    a = _assistant_stats(messages)
+    a = _assistant_summary(messages)
 
-    if not a:
-        return False, "no assistant messages"
+    if not a.count:
+        return CheckResult(False, "no assistant messages")
 
     # Expect at least one substantial assistant answer.
-    if max(s.content_len for s in a) < 400:
-        return False, f"assistant max content too small: {max(s.content_len for s in a)}"
+    if a.max_len < 400:
+        return CheckResult(False, f"assistant max content too small: {a.max_len}")
 
     # Frontend expects content to carry the main answer (thinking is optional).
-    empty_content_with_thinking = [s for s in a if s.content_len == 0 and s.has_thinking]
-    if empty_content_with_thinking:
-        return False, f"assistant messages with thinking but empty content: {[s.idx for s in empty_content_with_thinking]}"
+    if a.empty_with_thinking:
+        return CheckResult(False, f"assistant messages with thinking but empty content: {a.empty_with_thinking}")
 
-    return True, f"messages={len(messages)} assistant={len(a)} max_assistant_content={max(s.content_len for s in a)}"
+    return CheckResult(True, fields={"messages": len(messages), "assistant": a.count, "max_assistant_content": a.max_len})
 
 
-def _check_skills_youtube_preview_not_selected(path: Path) -> Tuple[bool, str]:
+def _check_skills_youtube_preview_not_selected(path: Path) -> CheckResult:
     """Regression: ensure link-preview description isn't chosen as the assistant answer."""
 
-    data = _load_json(path)
-    conv = parse_gemini_batchexecute_conversation(data)
+    conv = _parse_conv(path)
     messages = conv.get("messages") or []
 
-    assistants = [m for m in messages if isinstance(m, dict) and m.get("role") == "assistant"]
-    if len(assistants) < 2:
-        return False, f"expected >=2 assistant messages, got {len(assistants)}"
+    # Only the second assistant message is checked; pull it lazily and count the rest
+    # only for the success line.
+    assistants = (m for m in messages if isinstance(m, dict) and m.get("role") == "assistant")
+    first = next(assistants, None)
+    second_msg = next(assistants, None)
+    if second_msg is None:
+        return CheckResult(False, f"expected >=2 assistant messages, got {0 if first is None else 1}")
 
-    second = assistants[1].get("content") or ""
+    second = second_msg.get("content") or ""
     if not isinstance(second, str):
         second = ""
 
     # This string comes from a YouTube link preview description inside the export payload.
     if second.lstrip().startswith("For startup ideas, trends and prompts"):
-        return False, "selected YouTube preview description instead of assistant answer"
+        return CheckResult(False, "selected YouTube preview description instead of assistant answer")
 
     # The real answer for this sample includes a recognizable Chinese heading.
     if "项目结构最佳实践" not in second and "沉淀" not in second:
-        return False, "second assistant answer does not look like the expected Skills response"
+        return CheckResult(False, "second assistant answer does not look like the expected Skills response")
 
-    return True, f"messages={len(messages)} assistant={len(assistants)} second_assistant_len={len(second)}"
+    assistant_count = 2 + sum(1 for _ in assistants)
+    return CheckResult(
+        True,
+        fields={"messages": len(messages), "assistant": assistant_count, "second_assistant_len": len(second)},
+    )
 
 
-def _check_deep_research(path: Path) -> Tuple[bool, str]:
-    data = _load_json(path)
-    conv = parse_gemini_batchexecute_conversation(data)
+def _check_deep_research(path: Path) -> CheckResult:
+    conv = _parse_conv(path)
     messages = conv.get("messages") or []
-    a = _assistant_stats(messages)
+    a = _assistant_summary(messages)
 
-    if not a:
-        return False, "no assistant messages"
+    if not a.count:
+        return CheckResult(False, "no assistant messages")
 
     # Expect a large markdown report in content.
-    biggest = max(a, key=lambda s: s.content_len)
-    if biggest.content_len < 5000:
-        return False, f"deep research report too small: content_len={biggest.content_len}"
+    if a.max_len < 5000:
+        return CheckResult(False, f"deep research report too small: content_len={a.max_len}")
 
-    big_content = (messages[biggest.idx].get("content") or "")
-    if isinstance(big_content, str) and not (big_content.lstrip().startswith("#") or "\n##" in big_content):
+    big_content = a.max_content
+    if not (big_content.lstrip().startswith("#") or "\n##" in big_content):
         # Allow non-# markdown, but require some structure.
-        return False, "deep research biggest content does not look like a markdown report"
+        return CheckResult(False, "deep research biggest content does not look like a markdown report")
 
     # Ensure we didn't accidentally choose the confirmation link blob as the final answer.
-    if isinstance(big_content, str) and "googleusercontent.com/deep_research_confirmation_content" in big_content.lower():
-        return False, "deep research content is still the confirmation blob"
-
-    return True, f"messages={len(messages)} assistant={len(a)} biggest_assistant_idx={biggest.idx} biggest_content_len={biggest.content_len}"
+    if _CONFIRMATION_RE.search(big_content):
+        return CheckResult(False, "deep research content is still the confirmation blob")
+
+    return CheckResult(
+        True,
+        fields={
+            "messages": len(messages),
+            "assistant": a.count,
+            "biggest_assistant_idx": a.max_idx,
+            "biggest_content_len": a.max_len,
+        },
+    )
 
 
-def _check_math_escape_cleanup(path: Path) -> Tuple[bool, str]:
+def _check_math_escape_cleanup(path: Path) -> CheckResult:
     """Regression: KaTeX-sensitive escaping should be normalized in math spans."""
-    data = _load_json(path)
-    conv = parse_gemini_batchexecute_conversation(data)
+    conv = _parse_conv(path)
     messages = conv.get("messages") or []
 
-    blob = "\n\n".join(
-        str(m.get("content") or "")
-        for m in messages
-        if isinstance(m, dict) and isinstance(m.get("content"), str)
-    )
-    if not blob:
-        return False, "empty conversation content"
-
-    # Ensure the known problematic formula is normalized (subscripts + greek commands).
-    if r"$T_{pixel} = \alpha T_0 + \beta T_1 + \gamma T_2$" not in blob:
-        return False, "expected normalized T_pixel formula not found"
-
-    # These over-escaped forms are known to render incorrectly in KaTeX.
-    if r"T\_{pixel}" in blob or r"T\_0" in blob or r"\\alpha" in blob:
-        return False, "found over-escaped math tokens (e.g. T\\_0 or \\\\alpha)"
-
-    return True, "math escaping normalized for KaTeX"
+    # Probe each message's content in place instead of joining one big blob
+    # (no needle spans the old "\n\n" joiner, so results are the same).
+    has_content = found_formula = found_over_escaped = False
+    for m in messages:
+        c = m.get("content") if isinstance(m, dict) else None
+        if not isinstance(c, str) or not c:
+            continue
+        has_content = True
+        # Ensure the known problematic formula is normalized (subscripts + greek commands).
+        if not found_formula and r"$T_{pixel} = \alpha T_0 + \beta T_1 + \gamma T_2$" in c:
+            found_formula = True
+        # These over-escaped forms are known to render incorrectly in KaTeX.
+        if not found_over_escaped and (r"T\_{pixel}" in c or r"T\_0" in c or r"\\alpha" in c):
+            found_over_escaped = True
+        if found_formula and found_over_escaped:
+            break
+
+    if not has_content:
+        return CheckResult(False, "empty conversation content")
+    if not found_formula:
+        return CheckResult(False, "expected normalized T_pixel formula not found")
+    if found_over_escaped:
+        return CheckResult(False, "found over-escaped math tokens (e.g. T\\_0 or \\\\alpha)")
+
+    return CheckResult(True, "math escaping normalized for KaTeX")
 
 
 def main() -> int:
-    normal = ROOT / "data" / "gemini_export_2026-02-02_Piqa" / "深度学习：21世纪的生物学_e9acfbfd90.json"
-    deep = ROOT / "data" / "gemini_export_2026-02-02_Piqa" / "贝叶斯公式深度研究报告方案_05473e3116.json"
-    skills = ROOT / "data" / "gemini_export_2026-02-02_Piqa" / "Skills：AI 的最佳实践结晶_55321ed1f9.json"
-    persp = ROOT / "data" / "gemini_export_2026-02-02" / "透视空间重心坐标插值难点_84593318bd.json"
+    normal = _FIX_DIR / "深度学习：21世纪的生物学_e9acfbfd90.json"
+    deep = _FIX_DIR / "贝叶斯公式深度研究报告方案_05473e3116.json"
+    skills = _FIX_DIR / "Skills：AI 的最佳实践结晶_55321ed1f9.json"
+    persp = _FIX_DIR2 / "透视空间重心坐标插值难点_84593318bd.json"
 
     checks = [
         ("normal_chat", normal, _check_normal_chat),
@@ -164,15 +231,26 @@ def main() -> int:
         ("math_escape_cleanup", persp, _check_math_escape_cleanup),
     ]
 
-    ok_all = True
+    present = []
     for name, path, fn in checks:
         if not path.exists():
             print(f"[SKIP] {name}: missing sample: {path}")
             continue
-        ok, msg = fn(path)
-        ok_all = ok_all and ok
-        status = "OK" if ok else "FAIL"
-        print(f"[{status}] {name}: {path.name} :: {msg}")
+        present.append((name, path, fn))
+
+    # Checks are independent; threads share the cached sample loads (lru_cache) and start
+    # instantly, and map() keeps results in the original order.
+    if len(present) > 1:
+        with ThreadPoolExecutor(max_workers=len(present)) as ex:
+            results = list(ex.map(lambda check: check[2](check[1]), present))
+    else:
+        results = [fn(path) for _, path, fn in present]
+
+    ok_all = True
+    for (name, path, _), res in zip(present, results):
+        ok_all = ok_all and res.ok
+        status = "OK" if res.ok else "FAIL"
+        print(f"[{status}] {name}: {path.name} :: {res.describe()}")
 
     return 0 if ok_all else 1
 
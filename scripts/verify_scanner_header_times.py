@@ -0,0 +1,70 @@
+"""Quick regression check for the scanner's header timestamp probe.
+
+Writes exports whose create_time/update_time straddle the 4 KiB probe boundary and
+asserts both read paths (pread on a dir fd, plain file) return the full values.
+
+Usage:
+  D:/UGit/UniteChat/.venv/Scripts/python.exe scripts/verify_scanner_header_times.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+# Allow `from app...` / `from config...` imports
+sys.path.insert(0, "backend")
+
+from app.scanner import _HEADER_PROBE_BYTES, scanner
+
+
+_CREATE = b"1700000000.5"
+_UPDATE = b"1700012345.987"
+
+
+def _write_header(path: Path, cut_at: int) -> None:
+    """Export whose update_time value has its first `cut_at` bytes end exactly at the probe boundary."""
+    prefix = b'{"create_time": ' + _CREATE + b', "title": "'
+    key = b'", "update_time": '
+    pad = _HEADER_PROBE_BYTES - len(prefix) - len(key) - cut_at
+    path.write_bytes(prefix + b"a" * pad + key + _UPDATE + b', "mapping": {}}')
+
+
+def _read_paths(path: Path) -> List[Tuple[str, Tuple[Optional[float], Optional[float]]]]:
+    out = [("file", scanner._read_header_times(path)[1:])]
+    if hasattr(os, "pread"):
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            out.append(("dir_fd", scanner._read_header_times(path, dir_fd=dir_fd)[1:]))
+        finally:
+            os.close(dir_fd)
+    return out
+
+
+def main() -> int:
+    expected = (float(_UPDATE), float(_CREATE))
+    # Cut points inside update_time's value; len(b"1700012345.") puts "1700012345." exactly
+    # at byte 4096, so the probe ends right after the decimal point.
+    cuts = [3, len(b"1700012345"), len(b"1700012345."), len(b"1700012345.9"), len(_UPDATE)]
+
+    ok_all = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for cut in cuts:
+            path = Path(tmp) / f"cut_{cut}.json"
+            _write_header(path, cut)
+            for name, got in _read_paths(path):
+                ok = got == expected
+                ok_all = ok_all and ok
+                status = "OK" if ok else "FAIL"
+                probe_tail = _UPDATE[:cut].decode("ascii")
+                print(f"[{status}] probe ends after {probe_tail!r} ({name}) :: update={got[0]} create={got[1]}")
+
+    return 0 if ok_all else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
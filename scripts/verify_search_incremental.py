@@ -0,0 +1,96 @@
+"""Quick regression check for incremental search index updates.
+
+Builds a small per-file export folder in a temp dir, then runs incremental updates
+against the index and asserts that every doc's indexed text and search hits still line up.
+
+Usage:
+  D:/UGit/UniteChat/.venv/Scripts/python.exe scripts/verify_search_incremental.py
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+# Allow `from app...` / `from config...` imports
+sys.path.insert(0, "backend")
+
+from config import Config
+
+# Keep the check from reading or writing index snapshots of the real cache dir.
+Config.SEARCH_CACHE_DIR_PATH = None
+
+from app.search import ConversationSearcher, FolderSearchIndex, _doc_text
+
+
+def _write_export(folder: Path, title: str, text: str) -> None:
+    data = {"title": title, "mapping": {"n1": {"message": {"content": {"parts": [text]}}}}}
+    (folder / f"{title}_{title}id.json").write_text(json.dumps(data), encoding="utf-8")
+
+
+def _file_keys(folder: Path) -> Dict[str, Tuple[int, int]]:
+    keys: Dict[str, Tuple[int, int]] = {}
+    for p in folder.glob("*.json"):
+        st = p.stat()
+        keys[str(p)] = (st.st_mtime_ns, st.st_size)
+    return keys
+
+
+def _check_index(searcher: ConversationSearcher, idx: FolderSearchIndex, expect: Dict[str, str]) -> List[str]:
+    """Problems found in `idx`, given {title: a word only that doc contains}."""
+    problems: List[str] = []
+    for doc in idx.docs:
+        word = expect.get(doc.title)
+        if word is not None and word not in _doc_text(idx, doc):
+            problems.append(f"{doc.title}: indexed text {_doc_text(idx, doc)!r} lacks {word!r}")
+    for title, word in expect.items():
+        ids = [r["id"] for r in searcher._search_in_index(idx, word, limit=10)]
+        if ids != [f"{title}id"]:
+            problems.append(f"search {word!r}: expected [{title}id], got {ids}")
+    return problems
+
+
+def _check_two_updates_on_one_base(folder: Path) -> List[str]:
+    """Regression: an update that spilled texts but never went live must not shift the next one's offsets."""
+    _write_export(folder, "one", "alpha apple")
+    _write_export(folder, "two", "beta cherry")
+    searcher = ConversationSearcher()
+    base = searcher.ensure_index("verify", folder)
+
+    # First update on `base`: built, then dropped (as when it fails after spilling or loses a race).
+    _write_export(folder, "three", "gamma orange with a longer body than the next doc")
+    if searcher._update_index(base, _file_keys(folder)) is None:
+        return ["first update fell back to a full rebuild"]
+
+    # Second update on the same `base`.
+    _write_export(folder, "four", "delta mango")
+    idx = searcher._update_index(base, _file_keys(folder))
+    if idx is None or idx is base:
+        return ["second update did not produce an incremental index"]
+    return _check_index(
+        searcher, idx, {"one": "apple", "two": "cherry", "three": "orange", "four": "mango"}
+    )
+
+
+def main() -> int:
+    checks = [
+        ("two_updates_on_one_base", _check_two_updates_on_one_base),
+    ]
+
+    ok_all = True
+    for name, fn in checks:
+        with tempfile.TemporaryDirectory() as tmp:
+            problems = fn(Path(tmp))
+        ok_all = ok_all and not problems
+        status = "OK" if not problems else "FAIL"
+        print(f"[{status}] {name}" + "".join(f"\n  - {p}" for p in problems))
+
+    return 0 if ok_all else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())